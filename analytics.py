@@ -0,0 +1,452 @@
+# Dashboard computations, without Streamlit.
+#
+# Pure functions over DataFrames (and plain records for holdings): statistics,
+# cash flows, portfolio history, risk and returns, calendar aggregation,
+# holdings valuation and symbol analytics. The storage backends only return the
+# data; app.py memoizes these per data version and only draws the results;
+# benchmarks and worker processes can import this module directly.
+
+import calendar
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+MARKETS = ['spot', 'futures']
+
+
+def for_market(df, market):
+    return df[df['market'] == market]
+
+
+# Futures trades dijumlahkan per hari (daily entries lama dihitung sebagai satu trade)
+def futures_daily_table(df):
+    return df.groupby(df['date'].dt.normalize()).agg(
+        trades=('pnl', 'size'),
+        pnl=('pnl', 'sum'),
+        fees=('fees', 'sum'),
+        funding=('funding', 'sum'),
+        volume=('size', 'sum')
+    ).reset_index()
+
+
+# Symbol analytics: breakdown per symbol / market / bulan dilipat dari total per
+# (market, symbol, bulan) yang di-group oleh backend (storage.symbol_months)
+ANALYTICS_COLUMNS = ['total_pnl', 'avg_pnl', 'trades', 'win_rate', 'volume', 'best_trade', 'worst_trade']
+ANALYTICS_FOLD = {'total_pnl': 'sum', 'trades': 'sum', 'wins': 'sum', 'volume': 'sum',
+                  'best_trade': 'max', 'worst_trade': 'min'}
+
+
+def symbol_analytics(months):
+    months = months.astype({'market': pd.CategoricalDtype(MARKETS)})
+
+    def fold(keys):
+        df = months.groupby(keys, observed=True).agg(ANALYTICS_FOLD)
+        df['avg_pnl'] = df['total_pnl'] / df['trades']
+        df['win_rate'] = df['wins'] / df['trades'] * 100
+        return df[ANALYTICS_COLUMNS]
+
+    return {
+        'symbol': fold('symbol').sort_values('total_pnl', ascending=False),
+        'market': fold('market'),
+        'month': fold('month'),
+        'month_symbol': fold(['symbol', 'month'])
+    }
+
+
+# Statistik dari daily rollup: reference full recompute. The app reads the
+# incremental storage.StatsAccumulator instead; benchmarks/dashboard_pipeline.py
+# checks that both give the same numbers.
+def calculate_statistics(daily):
+    if len(daily) == 0:
+        return {
+            "total_profit": 0,
+            "total_loss": 0,
+            "net_pnl": 0,
+            "trading_volume": 0,
+            "win_rate": 0,
+            "winning_days": 0,
+            "losing_days": 0,
+            "breakeven_days": 0,
+            "avg_profit": 0,
+            "avg_loss": 0,
+            "profit_loss_ratio": 0
+        }
+
+    # Hitung daily PNL
+    daily_pnl = daily.groupby('date')['pnl'].sum().reset_index()
+
+    profits = daily_pnl[daily_pnl['pnl'] > 0]['pnl']
+    losses = daily_pnl[daily_pnl['pnl'] < 0]['pnl']
+
+    total_profit = profits.sum() if len(profits) > 0 else 0
+    total_loss = abs(losses.sum()) if len(losses) > 0 else 0
+
+    winning_days = len(profits)
+    losing_days = len(losses)
+    breakeven_days = len(daily_pnl[daily_pnl['pnl'] == 0])
+
+    total_days = len(daily_pnl)
+    win_rate = (winning_days / total_days * 100) if total_days > 0 else 0
+
+    avg_profit = profits.mean() if len(profits) > 0 else 0
+    avg_loss = abs(losses.mean()) if len(losses) > 0 else 0
+
+    profit_loss_ratio = (avg_profit / avg_loss) if avg_loss > 0 else 0
+
+    return {
+        "total_profit": total_profit,
+        "total_loss": total_loss,
+        "net_pnl": total_profit - total_loss,
+        "trading_volume": daily['volume'].sum(),
+        "win_rate": win_rate,
+        "winning_days": winning_days,
+        "losing_days": losing_days,
+        "breakeven_days": breakeven_days,
+        "avg_profit": avg_profit,
+        "avg_loss": avg_loss,
+        "profit_loss_ratio": profit_loss_ratio
+    }
+
+
+# Daily and cumulative PnL of one market, with its per-day summary
+def market_pnl(daily):
+    df = daily.groupby('date')['pnl'].sum().reset_index()
+    df['cumulative_pnl'] = df['pnl'].cumsum()
+    stats = {
+        'total': df['pnl'].sum(),
+        'average': df['pnl'].mean(),
+        'win_rate': (df['pnl'] > 0).sum() / len(df) * 100 if len(df) > 0 else 0
+    }
+    return df, stats
+
+
+# Volume per hari, hanya hari yang mencatat volume
+def daily_volume(daily_rollup):
+    volume = daily_rollup.groupby('date')['volume'].sum().reset_index()
+    return volume[volume['volume'] != 0]
+
+
+# Arus kas ledger per hari
+def daily_cash_flows(ledger):
+    # Signed balance change and capital change (deposits - withdrawals) per day
+    signs = ledger['type'].map(storage.LEDGER_SIGNS).fillna(0.0)
+    flows = pd.DataFrame({
+        'date': ledger['date'].dt.normalize(),
+        'cash_flow': ledger['amount'].fillna(0.0) * signs,
+    })
+    flows['capital_flow'] = flows['cash_flow'].where(ledger['type'].isin(storage.CAPITAL_FLOWS), 0.0)
+    return flows.groupby('date', sort=True)[['cash_flow', 'capital_flow']].sum().reset_index()
+
+
+# History portfolio (spot + futures, arus kas ledger, plus unrealized P&L holdings)
+def build_portfolio_history(daily, initial_balance, price_history=None, cash_flows=None):
+    # One groupby for every trading day, joined with the ledger's daily cash flows
+    history = daily.groupby('date', sort=True)['pnl'].sum().rename('daily_pnl').to_frame()
+    if cash_flows is not None and len(cash_flows) > 0:
+        history = history.join(cash_flows.set_index('date')[['cash_flow', 'capital_flow']], how='outer')
+    else:
+        history['cash_flow'] = 0.0
+        history['capital_flow'] = 0.0
+    history = history.fillna(0.0).rename_axis('date').reset_index()
+
+    if price_history is not None and len(price_history) > 0:
+        # Unrealized P&L per day: each snapshot's change from the holding's previous
+        # one, summed per date into a running total, then as-of joined onto the days
+        changes = price_history['unrealized_pnl'] - price_history.groupby('id')['unrealized_pnl'].shift(fill_value=0)
+        unrealized = changes.groupby(price_history['date']).sum().cumsum().rename('unrealized_pnl').reset_index()
+        dates = pd.concat([history['date'], unrealized['date']]).drop_duplicates().sort_values()
+        history = pd.DataFrame({'date': dates}).merge(history, on='date', how='left').fillna(0.0)
+        history = pd.merge_asof(history, unrealized, on='date')
+        history['unrealized_pnl'] = history['unrealized_pnl'].fillna(0)
+    else:
+        history['unrealized_pnl'] = 0.0
+
+    # Running totals; portfolio value is the running balance over PnL and cash flows
+    history['cumulative_pnl'] = history['daily_pnl'].cumsum()
+    history['capital'] = initial_balance + history['capital_flow'].cumsum()
+    history['portfolio_value'] = initial_balance + (history['daily_pnl'] + history['cash_flow']).cumsum()
+    history['equity'] = history['portfolio_value'] + history['unrealized_pnl']
+    return history
+
+
+# Current balance and capital, today's value with the unrealized PnL, and the
+# extremes of the history (None without history)
+def portfolio_summary(history, initial_balance, unrealized_pnl=0.0):
+    if len(history) == 0:
+        balance = capital = initial_balance
+    else:
+        balance = history['portfolio_value'].iloc[-1]
+        capital = history['capital'].iloc[-1]
+    summary = {
+        'balance': balance,
+        'capital': capital,
+        'net_deposits': capital - initial_balance,
+        'value': balance + unrealized_pnl,
+        'peak': None,
+        'lowest': None,
+        'best_day': None,
+        'worst_day': None
+    }
+    if len(history) > 0:
+        summary.update(
+            peak=history['portfolio_value'].max(),
+            lowest=history['portfolio_value'].min(),
+            best_day=history.loc[history['daily_pnl'].idxmax()],
+            worst_day=history.loc[history['daily_pnl'].idxmin()]
+        )
+    return summary
+
+
+# Risk metrics over the portfolio history (analytics.build_portfolio_history):
+# the realized portfolio value with the ledger's cash flows, so deposits and
+# withdrawals neither count as PnL nor open a drawdown. Equity, drawdown,
+# returns, streaks and rolling windows all come from the same sorted arrays,
+# with cumulative sums/maxima instead of per-day loops.
+# Crypto trades every day, so returns are annualized over 365 days.
+RISK_WINDOWS = (7, 30)
+DAYS_PER_YEAR = 365
+
+
+def _longest_run(mask):
+    # Longest run of consecutive True values
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return int((edges[1::2] - edges[::2]).max()) if len(edges) else 0
+
+
+def risk_metrics(history, initial_balance=0.0, today=None):
+    today = np.datetime64(pd.Timestamp(today or pd.Timestamp.today()).date(), 'D')
+    metrics = {'max_drawdown': 0.0, 'max_drawdown_pct': 0.0, 'drawdown_days': 0,
+               'sharpe_ratio': 0.0, 'sortino_ratio': 0.0,
+               'longest_win_streak': 0, 'longest_loss_streak': 0}
+    metrics.update({f"pnl_{window}d": 0.0 for window in RISK_WINDOWS})
+    columns = ['date', 'pnl', 'equity', 'drawdown'] + [f"pnl_{window}d" for window in RISK_WINDOWS]
+    if len(history) == 0:
+        metrics['series'] = pd.DataFrame(columns=columns)
+        return metrics
+
+    dates = history['date'].to_numpy(dtype='datetime64[D]')
+    equity = history['portfolio_value'].to_numpy(dtype='float64')
+    capital_flow = history['capital_flow'].to_numpy(dtype='float64')
+    # PnL of the day: trades plus ledger fees/funding, without deposits and withdrawals
+    pnl = (history['daily_pnl'] + history['cash_flow'] - history['capital_flow']).to_numpy(dtype='float64')
+    cumulative = np.cumsum(pnl)
+
+    # The peak moves with the capital flows (a withdrawal lowers it, a deposit
+    # raises it), i.e. the running maximum of the equity net of all flows so far.
+    # The starting balance counts as the first peak.
+    capital = np.cumsum(capital_flow)
+    peak = capital + np.maximum(np.maximum.accumulate(equity - capital), initial_balance)
+    drawdown = equity - peak
+    trough = int(np.argmin(drawdown))
+    # Drawdown is never positive; abs() keeps a zero drawdown from showing as "$-0.00"
+    metrics['max_drawdown'] = float(abs(drawdown[trough]))
+    if peak[trough] > 0:
+        metrics['max_drawdown_pct'] = metrics['max_drawdown'] / float(peak[trough]) * 100
+    # Days under water: distance to the last day at a peak. The starting balance
+    # is a peak on the day before the first entry, and a drawdown still open at
+    # the end runs until today.
+    peak_dates = np.concatenate(([dates[0] - np.timedelta64(1, 'D')], dates))
+    at_peak = np.concatenate(([True], drawdown >= 0))
+    last_peak = np.maximum.accumulate(np.where(at_peak, np.arange(len(at_peak)), 0))
+    under_water = dates - peak_dates[last_peak[1:]]
+    if drawdown[-1] < 0:
+        under_water = np.append(under_water, max(today, dates[-1]) - peak_dates[last_peak[-1]])
+    metrics['drawdown_days'] = int(under_water.astype('int64').max())
+
+    # Daily time-weighted returns (flows taken out) over every calendar day up
+    # to today, the value carried over days without entries, so annualizing by
+    # DAYS_PER_YEAR matches the sampling. Without any capital the returns are
+    # the plain PnL.
+    offsets = (dates - dates[0]).astype('int64')
+    filled = np.zeros(int((max(dates[-1], today) - dates[0]).astype('int64')) + 1, dtype='int64')
+    filled[offsets] = np.arange(len(dates))
+    filled = np.maximum.accumulate(filled)
+    calendar_flow = np.zeros(len(filled))
+    calendar_flow[offsets] = capital_flow
+    if initial_balance > 0 or (capital > 0).any():
+        returns, _ = time_weighted_returns(equity[filled], calendar_flow, initial_balance)
+    else:
+        returns = np.zeros(len(filled))
+        returns[offsets] = pnl
+    if len(returns) > 1:
+        mean, std = returns.mean(), returns.std(ddof=1)
+        downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+        scale = np.sqrt(DAYS_PER_YEAR)
+        metrics['sharpe_ratio'] = float(mean / std * scale) if std > 0 else 0.0
+        metrics['sortino_ratio'] = float(mean / downside * scale) if downside > 0 else 0.0
+
+    # Streaks over days with PnL; price snapshots and pure deposits do not break them
+    active = pnl[pnl != 0]
+    metrics['longest_win_streak'] = _longest_run(active > 0)
+    metrics['longest_loss_streak'] = _longest_run(active < 0)
+
+    series = {'date': dates.astype('datetime64[ns]'), 'pnl': pnl, 'equity': equity, 'drawdown': drawdown}
+    before = np.concatenate(([0.0], cumulative))
+    for window in RISK_WINDOWS:
+        # Calendar window ending on each day: cumulative sum minus the sum before its first day
+        first = np.searchsorted(dates, dates - np.timedelta64(window - 1, 'D'), side='left')
+        series[f"pnl_{window}d"] = cumulative - before[first]
+        # Current window ends today, which may be after the last entry
+        start = np.searchsorted(dates, today - np.timedelta64(window - 1, 'D'), side='left')
+        metrics[f"pnl_{window}d"] = float(cumulative[-1] - before[start])
+    metrics['series'] = pd.DataFrame(series, columns=columns)
+    return metrics
+
+
+# Returns over the daily equity series (realized balance + unrealized PnL) with
+# the capital flows (deposits - withdrawals) of each day. Flows are counted at
+# the start of their day.
+
+def time_weighted_returns(equity, capital_flow, initial_balance):
+    # Daily returns with the flows taken out, chained into a cumulative return
+    start = np.concatenate(([initial_balance], equity[:-1])) + capital_flow
+    daily = np.divide(equity, start, out=np.ones_like(equity), where=start > 0) - 1
+    return daily, np.cumprod(1 + daily) - 1
+
+
+IRR_TOLERANCE = 1e-10
+IRR_MAX_ITERATIONS = 200
+
+
+def irr(flows, years):
+    # Rate r with sum(flows / (1 + r) ** years) == 0, solved for x = 1 + r by
+    # Newton steps kept inside a bracket (bisection when a step leaves it).
+    # Each step is one vectorized pass over all flows. None without a sign change.
+    def npv(x):
+        discount = x ** -years
+        return np.dot(flows, discount), np.dot(flows, -years * discount / x)
+
+    low, high = 1e-9, 2.0
+    value_low, _ = npv(low)
+    value_high, _ = npv(high)
+    while value_low * value_high > 0 and high < 1e6:
+        high *= 4
+        value_high, _ = npv(high)
+    if value_low * value_high > 0:
+        return None
+    x = (low + high) / 2
+    for _ in range(IRR_MAX_ITERATIONS):
+        value, slope = npv(x)
+        if abs(value) < IRR_TOLERANCE:
+            break
+        if value * value_low > 0:
+            low, value_low = x, value
+        else:
+            high = x
+        step = x - value / slope if slope else None
+        x = step if step is not None and low < step < high else (low + high) / 2
+        if high - low < IRR_TOLERANCE:
+            break
+    return float(x - 1)
+
+
+def returns_metrics(history, initial_balance, current_equity=None, today=None):
+    metrics = {'twr': None, 'twr_annualized': None, 'mwr': None, 'days': 0,
+               'series': pd.DataFrame(columns=['date', 'daily_return', 'twr'])}
+    history = history[['date', 'equity', 'capital_flow']]
+    if current_equity is not None:
+        # The last day is valued at the current equity (e.g. live unrealized PnL)
+        today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+        if len(history) == 0 or history['date'].iloc[-1] < today:
+            current = pd.DataFrame({'date': [today], 'equity': [float(current_equity)], 'capital_flow': [0.0]})
+            history = pd.concat([history, current], ignore_index=True) if len(history) else current
+        else:
+            history = history.copy()
+            history.loc[history.index[-1], 'equity'] = float(current_equity)
+    if len(history) == 0:
+        return metrics
+    dates = history['date'].to_numpy(dtype='datetime64[D]')
+    equity = history['equity'].to_numpy(dtype='float64')
+    capital_flow = history['capital_flow'].to_numpy(dtype='float64')
+
+    days = int((dates[-1] - dates[0]).astype('int64')) + 1
+    metrics['days'] = days
+    # Without capital (no balance, no deposits) the equity is plain PnL from zero,
+    # which has no return; the returns stay None
+    if not (initial_balance > 0 or (np.cumsum(capital_flow) > 0).any()):
+        return metrics
+
+    daily, twr = time_weighted_returns(equity, capital_flow, initial_balance)
+    metrics['twr'] = float(twr[-1])
+    if twr[-1] > -1:
+        metrics['twr_annualized'] = float((1 + twr[-1]) ** (DAYS_PER_YEAR / days) - 1)
+    metrics['series'] = pd.DataFrame({'date': history['date'], 'daily_return': daily, 'twr': twr})
+
+    # Investor's view: money in is negative, the ending equity comes back at the end
+    years = np.concatenate((
+        [0.0],
+        (dates - dates[0]).astype('int64') / DAYS_PER_YEAR,
+        [days / DAYS_PER_YEAR],
+    ))
+    flows = np.concatenate(([-initial_balance], -capital_flow, [equity[-1]]))
+    if (flows < 0).any() and (flows > 0).any():
+        metrics['mwr'] = irr(flows, years)
+    return metrics
+
+
+# Calendar bulanan dari PnL per tanggal (day of month -> pnl). Weeks start on
+# Sunday; each day gets a category: 0 no trades, 1 profit, 2 loss, 3 breakeven.
+def calendar_grid(daily_pnl, year, month):
+    weeks = calendar.Calendar(firstweekday=6).monthdayscalendar(year, month)
+    z, hover, cells = [], [], []
+    for week_idx, week in enumerate(weeks):
+        z_row, hover_row = [], []
+        for day_idx, day in enumerate(week):
+            if day == 0:
+                z_row.append(None)
+                hover_row.append("")
+                continue
+
+            pnl = daily_pnl.get(day)
+            if pnl is None:
+                category = 0
+                pnl_text = ""
+            else:
+                category = 1 if pnl > 0 else 2 if pnl < 0 else 3
+                pnl_text = f"+{pnl:.2f}" if pnl > 0 else f"{pnl:.2f}"
+            z_row.append(category)
+            hover_row.append(f"{year}-{month:02d}-{day:02d}" + (f"<br>P&L: {pnl_text}" if pnl_text else ""))
+            cells.append({'row': week_idx, 'col': day_idx, 'day': day,
+                          'category': category, 'pnl_text': pnl_text})
+        z.append(z_row)
+        hover.append(hover_row)
+    return {'weeks': len(weeks), 'z': z, 'hover': hover, 'cells': cells}
+
+
+# Nilai holdings: cost basis, nilai pasar dan return per posisi pada current price
+def holdings_valuation(holdings):
+    df = storage.typed_frame(holdings, storage.HOLDINGS_SCHEMA)
+    df['cost_basis'] = df['quantity'] * df['entry_price']
+    df['current_value'] = df['quantity'] * df['current_price']
+    df['pnl_pct'] = ((df['current_price'] - df['entry_price']) / df['entry_price'] * 100).where(
+        df['entry_price'] > 0, 0.0)
+    return df
+
+
+def holdings_totals(holdings):
+    df = holdings_valuation(holdings)
+    return {
+        'positions': len(df),
+        'profitable': int((df['unrealized_pnl'] > 0).sum()),
+        'cost_basis': float(df['cost_basis'].sum()),
+        'current_value': float(df['current_value'].sum()),
+        'unrealized_pnl': float(df['unrealized_pnl'].sum())
+    }
+
+
+# Ledger totals per type, with the fees/funding recorded on futures trades
+def cash_summary(ledger, futures):
+    totals = ledger.groupby('type')['amount'].sum() if len(ledger) > 0 else pd.Series(dtype='float64')
+    summary = {
+        'deposits': totals.get('deposit', 0.0),
+        'withdrawals': totals.get('withdrawal', 0.0),
+        'ledger_fees': totals.get('fee', 0.0),
+        'ledger_funding': totals.get('funding', 0.0),
+        'futures_fees': futures['fees'].sum() if len(futures) > 0 else 0.0,
+        'futures_funding': futures['funding'].sum() if len(futures) > 0 else 0.0
+    }
+    summary['fees'] = summary['ledger_fees'] + summary['futures_fees']
+    summary['funding'] = summary['ledger_funding'] + summary['futures_funding']
+    return summary
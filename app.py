@@ -4,8 +4,13 @@ import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
 import calendar
-import json
+import hashlib
 import os
+import re
+
+import analytics
+import prices
+import storage
 
 # Konfigurasi halaman
 st.set_page_config(page_title="Trading Journal", layout="wide", initial_sidebar_state="collapsed")
@@ -138,6 +143,41 @@ DATA_FILE = "trading_data.json"
 FUTURES_FILE = "futures_data.json"
 BALANCE_FILE = "balance_data.json"
 HOLDINGS_FILE = "holdings_data.json"
+ROLLUP_FILE = "rollup_data.json"
+STATS_FILE = "stats_data.json"
+PRICE_HISTORY_FILE = "holdings_prices.arrow"
+LEDGER_FILE = "ledger_data.json"
+SQLITE_FILE = "trading_journal.db"
+
+# Mode penyimpanan: "jsonl" (append-only log + compaction), "json" (tulis ulang file)
+# atau "sqlite" (satu database dengan index date/symbol/status)
+try:
+    STORAGE_MODE = st.secrets["storage"]["mode"]
+except Exception:
+    STORAGE_MODE = "jsonl"
+try:
+    SQLITE_FILE = st.secrets["storage"]["sqlite_path"]
+except Exception:
+    pass
+try:
+    DATA_DIR = st.secrets["storage"]["data_dir"]
+except Exception:
+    DATA_DIR = "data"
+
+# Harga live holdings: [prices] di secrets, provider "replay" membaca file CSV/Parquet
+# (symbol, price, timestamp opsional). Tanpa [prices] harga holdings hanya dari input manual.
+try:
+    PRICE_CONFIG = dict(st.secrets["prices"])
+except Exception:
+    PRICE_CONFIG = {}
+
+# Akun: [accounts.<nama>] di secrets, masing-masing dengan password admin/guest dan
+# journal sendiri di DATA_DIR/<nama>-<hash>. Tanpa [accounts] ada satu akun "default".
+DEFAULT_ACCOUNT = "default"
+try:
+    ACCOUNTS = {name: dict(config) for name, config in st.secrets["accounts"].items()}
+except Exception:
+    ACCOUNTS = {}
 
 # Load passwords from Streamlit secrets (production) or fallback (development)
 try:
@@ -147,50 +187,215 @@ except:
     # Fallback for local development
     ADMIN_PASSWORD = "000000"
     GUEST_PASSWORD = "123456"
-    st.warning("⚠️ Using default passwords. Please configure secrets for production!")
+    if not ACCOUNTS:
+        st.warning("⚠️ Using default passwords. Please configure secrets for production!")
 
-# Fungsi untuk load data
-def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as f:
-            return json.load(f)
-    return []
-
-def load_futures_data():
-    if os.path.exists(FUTURES_FILE):
-        with open(FUTURES_FILE, 'r') as f:
-            return json.load(f)
-    return []
+if not ACCOUNTS:
+    ACCOUNTS = {DEFAULT_ACCOUNT: {'admin': ADMIN_PASSWORD, 'guest': GUEST_PASSWORD}}
+
+STORE_FILES = {'spot': DATA_FILE, 'futures': FUTURES_FILE, 'holdings': HOLDINGS_FILE,
+               'balance': BALANCE_FILE, 'rollup': ROLLUP_FILE, 'stats': STATS_FILE,
+               'price_history': PRICE_HISTORY_FILE, 'ledger': LEDGER_FILE}
+
+# Path store per akun; akun "default" tetap memakai file di folder kerja. Nama folder
+# disanitasi untuk filesystem, jadi hash nama asli ditambahkan agar akun seperti "alice.b"
+# dan "alice_b" (atau "Alice" dan "alice" di filesystem case-insensitive) tidak berbagi journal.
+def account_directory(account):
+    digest = hashlib.sha1(account.encode('utf-8')).hexdigest()[:10]
+    return f"{re.sub(r'[^A-Za-z0-9_-]', '_', account)}-{digest}"
+
+def account_paths(account):
+    if account == DEFAULT_ACCOUNT:
+        return dict(STORE_FILES), SQLITE_FILE
+    directory = os.path.join(DATA_DIR, account_directory(account))
+    paths = {store: os.path.join(directory, name) for store, name in STORE_FILES.items()}
+    return paths, os.path.join(directory, os.path.basename(SQLITE_FILE))
 
+# Backend dibuat sekali per akun per proses dan dipakai bersama oleh semua session
+# akun tersebut; cache data di bawah di-key dengan signature yang memuat path akun
+@st.cache_resource(show_spinner=False)
+def get_storage_backend(mode, account):
+    paths, sqlite_path = account_paths(account)
+    directory = os.path.dirname(sqlite_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return storage.create_backend(mode, paths, sqlite_path)
+
+# Diset di main() setelah login, sesuai akun session
+backend = None
+
+# Satu price feed per proses; thread-nya me-refresh harga di background per TTL
+@st.cache_resource(show_spinner=False)
+def get_price_feed(provider, path, ttl, start=None, speed=1.0):
+    options = {'path': path}
+    if start is not None:
+        options.update(start=start, speed=speed)
+    return prices.PriceFeed(prices.create_provider(provider, **options), ttl)
+
+def price_feed():
+    if not PRICE_CONFIG:
+        return None
+    return get_price_feed(PRICE_CONFIG.get('provider', 'replay'), PRICE_CONFIG['file'],
+                          float(PRICE_CONFIG.get('ttl', 60)), PRICE_CONFIG.get('replay_start'),
+                          float(PRICE_CONFIG.get('replay_speed', 1.0)))
+
+def live_prices(symbols):
+    feed = price_feed()
+    return feed.prices(symbols) if feed is not None else {}
+
+# Status price feed di sidebar: error terakhir dan waktu update terakhir
+def render_price_feed_status():
+    feed = price_feed()
+    if feed is None:
+        return
+    if feed.error:
+        st.sidebar.warning(f"⚠️ Price feed error: {feed.error}")
+    if feed.updated_at:
+        st.sidebar.caption(f"💹 Live prices updated {datetime.fromtimestamp(feed.updated_at):%H:%M:%S}")
+    else:
+        st.sidebar.caption("💹 Live prices: waiting for first update")
+
+# Loaded stores and query results are shared across reruns and sessions until
+# the store's signature (file mtime/size/inode or SQLite version counter)
+# changes. Every write changes it, so writes never need to clear a cache.
+@st.cache_data(show_spinner=False, max_entries=32)
+def _load_store_cached(store, signature):
+    return backend.load(store)
+
+# Frames are shared as they are (not pickled per hit like cache_data), so the
+# memory-mapped Arrow columns stay zero-copy; callers must not modify them
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _load_frame_cached(store, signature):
+    return backend.frame(store)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _load_balance_cached(signature):
+    return backend.load_balance()
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def _query_cached(query, signature, *args):
+    return getattr(backend, query)(*args)
+
+# Fungsi untuk load data
 def load_balance_data():
-    if os.path.exists(BALANCE_FILE):
-        with open(BALANCE_FILE, 'r') as f:
-            data = json.load(f)
-            return data.get('initial_balance', 0)
-    return 0
-
-def load_holdings_data():
-    if os.path.exists(HOLDINGS_FILE):
-        with open(HOLDINGS_FILE, 'r') as f:
-            return json.load(f)
-    return []
-
-# Fungsi untuk save data
+    return _load_balance_cached(backend.signature('balance'))
+
+def load_holdings_data(status=None):
+    signature = backend.signature('holdings')
+    if status is None:
+        return _load_store_cached('holdings', signature)
+    return _query_cached('holdings', signature, status)
+
+# Open holdings dinilai dengan harga live (kalau price feed aktif), tanpa menulis ke store
+def load_open_holdings():
+    open_holdings = load_holdings_data('open')
+    latest = live_prices({h['symbol'] for h in open_holdings})
+    if not latest:
+        return open_holdings
+    repriced = {h['id']: h for h in storage.reprice_holdings(open_holdings, latest)}
+    return [repriced.get(h['id'], h) for h in open_holdings]
+
+# Harga dan unrealized P&L per (holding id, tanggal)
+def load_price_history():
+    return _query_cached('price_history', backend.signature('price_history'))
+
+# Versi DataFrame (tipe kolom sudah di-parse)
+def load_futures_frame():
+    return _load_frame_cached('futures', backend.signature('futures'))
+
+def load_ledger_frame():
+    return _load_frame_cached('ledger', backend.signature('ledger'))
+
+# Arus kas ledger per hari (cash_flow: perubahan saldo, capital_flow: deposit - withdrawal)
+@st.cache_data(show_spinner=False, max_entries=8)
+def _cash_flows_cached(signature):
+    return analytics.daily_cash_flows(backend.frame('ledger'))
+
+def load_cash_flows():
+    return _cash_flows_cached(backend.signature('ledger'))
+
+# Query per bulan / per symbol (di-push ke SQL pada backend sqlite)
+def load_month_trades(store, year, month):
+    return _query_cached('month_trades', backend.signature(store), store, year, month)
+
+def load_month_daily_pnl(store, year, month):
+    return _query_cached('month_daily_pnl', backend.signature(store), store, year, month)
+
+# Rollup PNL/volume per market dan symbol; period 'day' atau 'month'
+def load_rollup(period='day'):
+    return _query_cached('rollup', trades_version(), period)
+
+# Statistik dari accumulator yang di-update per entry (lihat analytics.calculate_statistics)
+def load_statistics():
+    return _query_cached('statistics', trades_version())
+
+# Satu halaman tabel; filter, sort dan LIMIT/OFFSET dijalankan di backend
+def load_page(store, start, end, symbols, sort_by, descending, offset, limit):
+    return _query_cached('page', backend.signature(store), store, start, end, symbols,
+                         sort_by, descending, offset, limit)
+
+def load_page_count(store, start, end, symbols):
+    return _query_cached('count', backend.signature(store), store, start, end, symbols)
+
+def load_count(store):
+    return load_page_count(store, None, None, ())
+
+def load_symbols(store):
+    return _query_cached('symbols', backend.signature(store), store)
+
+# Fungsi untuk save data (tulis ulang seluruh store)
 def save_data(data):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    backend.save('spot', data)
 
 def save_futures_data(data):
-    with open(FUTURES_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    backend.save('futures', data)
 
 def save_balance_data(balance):
-    with open(BALANCE_FILE, 'w') as f:
-        json.dump({'initial_balance': balance}, f, indent=2)
+    backend.save_balance(balance)
 
 def save_holdings_data(data):
-    with open(HOLDINGS_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    backend.save('holdings', data)
+
+# Fungsi untuk menambah entry (append-only di mode "jsonl", INSERT di mode "sqlite")
+def append_data(entry):
+    backend.append('spot', [entry])
+
+def append_futures_data(entry):
+    backend.append('futures', [entry])
+
+def append_ledger_entry(entry):
+    backend.append('ledger', [entry])
+
+def save_ledger_data(data):
+    backend.save('ledger', data)
+
+# Bulk import CSV/Parquet (satu batch write, duplikat dilewati)
+def import_trades(store, uploaded_file):
+    chunks = storage.read_import_chunks(uploaded_file, uploaded_file.name)
+    result = storage.import_records(backend, store, chunks)
+    return result
+
+# Holding baru atau update holding yang sudah ada (berdasarkan 'id')
+def upsert_holding(holding):
+    backend.append('holdings', [holding])
+
+# Update holding dari versi tersimpan terbaru (bukan salinan di session), supaya
+# perubahan dari session lain tidak tertimpa. changes(current) -> field baru atau None
+def update_holding(holding_id, changes):
+    updated = backend.update('holdings', holding_id, changes)
+    return updated
+
+# Mark-to-market: harga baru {symbol: price} ke semua open holdings dalam satu write
+def reprice_open_holdings(new_prices):
+    updated = backend.update_batch('holdings', lambda records: storage.reprice_holdings(records, new_prices))
+    return len(updated)
+
+# Pilihan akun di halaman login (disembunyikan kalau hanya ada satu akun)
+def select_account(key):
+    names = list(ACCOUNTS)
+    if len(names) == 1:
+        return names[0]
+    return st.selectbox("Account", names, key=key)
 
 # Fungsi autentikasi
 def check_password():
@@ -198,6 +403,7 @@ def check_password():
         st.session_state.authenticated = False
         st.session_state.user_role = None
         st.session_state.login_page = "select"  # select, admin, guest
+        st.session_state.account = None
     
     if not st.session_state.authenticated:
         # Landing page - pilih role
@@ -232,14 +438,16 @@ def check_password():
                 st.markdown("### Administrator Access")
                 st.warning("⚠️ This area is for authorized administrators only")
                 
+                account = select_account("admin_account")
                 password = st.text_input("Admin Password", type="password", placeholder="Enter admin password", key="admin_pass")
                 
                 col_btn1, col_btn2 = st.columns(2)
                 with col_btn1:
                     if st.button("🔓 Login", use_container_width=True, type="primary"):
-                        if password == ADMIN_PASSWORD:
+                        if password == ACCOUNTS[account].get('admin'):
                             st.session_state.authenticated = True
                             st.session_state.user_role = "admin"
+                            st.session_state.account = account
                             st.success("✅ Admin login successful!")
                             st.balloons()
                             st.rerun()
@@ -260,14 +468,16 @@ def check_password():
                 st.markdown("### Guest Access")
                 st.info("💡 Guest users have read-only access to view trading analytics and performance")
                 
+                account = select_account("guest_account")
                 password = st.text_input("Guest Password", type="password", placeholder="Enter guest password", key="guest_pass")
                 
                 col_btn1, col_btn2 = st.columns(2)
                 with col_btn1:
                     if st.button("🔓 Login", use_container_width=True, type="primary"):
-                        if password == GUEST_PASSWORD:
+                        if password == ACCOUNTS[account].get('guest'):
                             st.session_state.authenticated = True
                             st.session_state.user_role = "guest"
+                            st.session_state.account = account
                             st.success("✅ Guest login successful!")
                             st.rerun()
                         else:
@@ -280,176 +490,115 @@ def check_password():
         
         st.stop()
 
-# Fungsi untuk menghitung statistik
-def calculate_statistics(data, futures_data):
-    # Gabungkan data spot dan futures
-    all_data = data.copy()
-    
-    if not all_data and not futures_data:
-        return {
-            "total_profit": 0,
-            "total_loss": 0,
-            "net_pnl": 0,
-            "trading_volume": 0,
-            "win_rate": 0,
-            "winning_days": 0,
-            "losing_days": 0,
-            "breakeven_days": 0,
-            "avg_profit": 0,
-            "avg_loss": 0,
-            "profit_loss_ratio": 0
-        }
-    
-    # Tambahkan futures data ke dalam perhitungan
-    df_list = []
-    if all_data:
-        df_spot = pd.DataFrame(all_data)
-        df_spot['date'] = pd.to_datetime(df_spot['date'])
-        df_list.append(df_spot)
-    
-    if futures_data:
-        df_futures = pd.DataFrame(futures_data)
-        df_futures['date'] = pd.to_datetime(df_futures['date'])
-        df_list.append(df_futures)
-    
-    df = pd.concat(df_list, ignore_index=True) if df_list else pd.DataFrame()
-    
-    if len(df) == 0:
-        return {
-            "total_profit": 0,
-            "total_loss": 0,
-            "net_pnl": 0,
-            "trading_volume": 0,
-            "win_rate": 0,
-            "winning_days": 0,
-            "losing_days": 0,
-            "breakeven_days": 0,
-            "avg_profit": 0,
-            "avg_loss": 0,
-            "profit_loss_ratio": 0
-        }
-    
-    # Hitung daily PNL
-    daily_pnl = df.groupby('date')['pnl'].sum().reset_index()
-    
-    profits = daily_pnl[daily_pnl['pnl'] > 0]['pnl']
-    losses = daily_pnl[daily_pnl['pnl'] < 0]['pnl']
-    
-    total_profit = profits.sum() if len(profits) > 0 else 0
-    total_loss = abs(losses.sum()) if len(losses) > 0 else 0
-    
-    winning_days = len(profits)
-    losing_days = len(losses)
-    breakeven_days = len(daily_pnl[daily_pnl['pnl'] == 0])
-    
-    total_days = len(daily_pnl)
-    win_rate = (winning_days / total_days * 100) if total_days > 0 else 0
-    
-    avg_profit = profits.mean() if len(profits) > 0 else 0
-    avg_loss = abs(losses.mean()) if len(losses) > 0 else 0
-    
-    profit_loss_ratio = (avg_profit / avg_loss) if avg_loss > 0 else 0
-    
-    return {
-        "total_profit": total_profit,
-        "total_loss": total_loss,
-        "net_pnl": total_profit - total_loss,
-        "trading_volume": df['volume'].sum() if 'volume' in df.columns else 0,
-        "win_rate": win_rate,
-        "winning_days": winning_days,
-        "losing_days": losing_days,
-        "breakeven_days": breakeven_days,
-        "avg_profit": avg_profit,
-        "avg_loss": avg_loss,
-        "profit_loss_ratio": profit_loss_ratio
-    }
+# Versi data trades, berubah setiap kali salah satu journal ditulis
+def trades_version():
+    return (backend.signature('spot'), backend.signature('futures'))
+
+# Symbol analytics per versi data trades, dilipat dari total per (market, symbol, bulan)
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_symbol_analytics(version):
+    return analytics.symbol_analytics(backend.symbol_months())
+
+# History portfolio per versi data trades, ledger dan harga holdings
+@st.cache_data(show_spinner=False, max_entries=8)
+def _portfolio_history_cached(version, ledger_signature, prices_signature, initial_balance):
+    return analytics.build_portfolio_history(load_rollup('day'), initial_balance, load_price_history(), load_cash_flows())
+
+def load_portfolio_history(initial_balance):
+    return _portfolio_history_cached(trades_version(), backend.signature('ledger'),
+                                     backend.signature('price_history'), initial_balance)
+
+# Versi history portfolio plus tanggal hari ini, untuk hasil yang dihitung sampai hari ini
+def portfolio_version(initial_balance):
+    return (trades_version(), backend.signature('ledger'), backend.signature('price_history'),
+            initial_balance, datetime.now().strftime('%Y-%m-%d'))
+
+# Time-weighted (TWR) dan money-weighted (IRR) return dari history portfolio yang sama. Equity
+# sekarang dihitung sebagai hari ini, jadi tanggal ikut di key.
+@st.cache_data(show_spinner=False, max_entries=8)
+def _returns_cached(version, ledger_signature, prices_signature, initial_balance, today, current_equity):
+    return analytics.returns_metrics(load_portfolio_history(initial_balance), initial_balance,
+                                     current_equity, today)
+
+def load_returns(initial_balance, current_equity):
+    return _returns_cached(*portfolio_version(initial_balance), current_equity)
+
+# Drawdown, Sharpe/Sortino, streak dan rolling P&L dari history portfolio yang sama (deposit dan
+# withdrawal bukan P&L). Rolling P&L dan drawdown yang masih terbuka dihitung sampai hari ini,
+# jadi tanggal ikut di key.
+@st.cache_data(show_spinner=False, max_entries=8)
+def _risk_cached(version, ledger_signature, prices_signature, initial_balance, today):
+    return analytics.risk_metrics(load_portfolio_history(initial_balance), initial_balance, today)
+
+def load_risk_metrics(initial_balance):
+    return _risk_cached(*portfolio_version(initial_balance))
+
+# Warna sel calendar: kosong, profit, loss, breakeven
+CALENDAR_COLORS = ['#2d2d3d', '#166534', '#991b1b', '#374151']
+CALENDAR_TEXT_COLORS = ['#ffffff', '#10b981', '#ef4444', '#9ca3af']
 
 # Fungsi untuk membuat calendar view
-def create_calendar_view(data, year, month, title="Calendar View"):
-    if not data:
-        return None
-    
-    df = pd.DataFrame(data)
-    df['date'] = pd.to_datetime(df['date'])
-    daily_pnl = df.groupby('date')['pnl'].sum().reset_index()
-    
-    # Filter by year and month
-    daily_pnl = daily_pnl[(daily_pnl['date'].dt.year == year) & 
-                          (daily_pnl['date'].dt.month == month)]
-    
-    # Create calendar
-    cal = calendar.monthcalendar(year, month)
-    
-    fig = go.Figure()
+def create_calendar_view(daily_pnl, year, month, title="Calendar View"):
+    grid = analytics.calendar_grid(daily_pnl, year, month)
     
     # Hari dalam seminggu
     days = ['S', 'M', 'T', 'W', 'T', 'F', 'S']
     
-    # Plot calendar grid
-    for week_idx, week in enumerate(cal):
-        for day_idx, day in enumerate(week):
-            if day == 0:
-                continue
-            
-            date = datetime(year, month, day)
-            pnl_data = daily_pnl[daily_pnl['date'] == date]
-            
-            if len(pnl_data) > 0:
-                pnl = pnl_data['pnl'].values[0]
-                color = '#166534' if pnl > 0 else '#991b1b' if pnl < 0 else '#374151'
-                text_color = '#10b981' if pnl > 0 else '#ef4444' if pnl < 0 else '#9ca3af'
-                pnl_text = f"+{pnl:.2f}" if pnl > 0 else f"{pnl:.2f}"
-            else:
-                color = '#2d2d3d'
-                text_color = '#ffffff'
-                pnl_text = ""
-            
-            # Draw cell
-            fig.add_shape(
-                type="rect",
-                x0=day_idx, y0=-week_idx,
-                x1=day_idx + 0.9, y1=-week_idx - 0.9,
-                fillcolor=color,
-                line=dict(color="#1e1e2e", width=2)
-            )
-            
-            # Add day number
-            fig.add_annotation(
-                x=day_idx + 0.15, y=-week_idx - 0.2,
-                text=str(day),
-                showarrow=False,
-                font=dict(size=16, color="#ffffff"),
-                xanchor="left",
-                yanchor="top"
-            )
-            
-            # Add PNL
-            if pnl_text:
-                fig.add_annotation(
-                    x=day_idx + 0.45, y=-week_idx - 0.6,
-                    text=pnl_text,
-                    showarrow=False,
-                    font=dict(size=12, color=text_color, family="monospace"),
-                    xanchor="center"
-                )
+    # One heatmap for cells, one text trace for labels
+    text_x, text_y, text, text_color, text_size = [], [], [], [], []
+    for cell in grid['cells']:
+        # Day number (top-left of the cell)
+        text_x.append(cell['col'] - 0.3)
+        text_y.append(cell['row'] - 0.25)
+        text.append(str(cell['day']))
+        text_color.append('#ffffff')
+        text_size.append(16)
+        
+        # PNL
+        if cell['pnl_text']:
+            text_x.append(cell['col'])
+            text_y.append(cell['row'] + 0.15)
+            text.append(cell['pnl_text'])
+            text_color.append(CALENDAR_TEXT_COLORS[cell['category']])
+            text_size.append(12)
     
-    # Add day headers
-    for idx, day in enumerate(days):
-        fig.add_annotation(
-            x=idx + 0.45, y=0.5,
-            text=day,
-            showarrow=False,
-            font=dict(size=14, color="#a0a0b0", weight="bold")
-        )
+    # Stepped colorscale so each category maps to exactly one color
+    colorscale = []
+    for idx, color in enumerate(CALENDAR_COLORS):
+        colorscale.append([max(idx - 0.5, 0) / 3, color])
+        colorscale.append([min(idx + 0.5, 3) / 3, color])
+    
+    fig = go.Figure()
+    fig.add_trace(go.Heatmap(
+        z=grid['z'],
+        x=list(range(7)),
+        y=list(range(grid['weeks'])),
+        zmin=0, zmax=3,
+        colorscale=colorscale,
+        showscale=False,
+        xgap=4, ygap=4,
+        text=grid['hover'],
+        hovertemplate="%{text}<extra></extra>"
+    ))
+    fig.add_trace(go.Scatter(
+        x=text_x, y=text_y,
+        mode='text',
+        text=text,
+        textfont=dict(color=text_color, size=text_size),
+        textposition='middle center',
+        hoverinfo='skip'
+    ))
     
-    fig.update_xaxes(range=[-0.5, 7], showgrid=False, zeroline=False, visible=False)
-    fig.update_yaxes(range=[-len(cal) - 0.5, 1], showgrid=False, zeroline=False, visible=False)
+    fig.update_xaxes(range=[-0.5, 6.5], showgrid=False, zeroline=False, side='top',
+                     tickmode='array', tickvals=list(range(7)), ticktext=days,
+                     tickfont=dict(size=14, color="#a0a0b0", weight="bold"))
+    fig.update_yaxes(range=[grid['weeks'] - 0.5, -0.5], showgrid=False, zeroline=False, visible=False)
     
     fig.update_layout(
         height=500,
         plot_bgcolor='#1e1e2e',
         paper_bgcolor='#1e1e2e',
-        margin=dict(l=20, r=20, t=60, b=20),
+        margin=dict(l=20, r=20, t=80, b=20),
         showlegend=False,
         title=dict(
             text=title,
@@ -461,16 +610,201 @@ def create_calendar_view(data, year, month, title="Calendar View"):
     
     return fig
 
+# Calendar figure di-cache per (market, tahun, bulan, versi data)
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_calendar_view(market, year, month, version, _daily_pnl, title):
+    return create_calendar_view(_daily_pnl, year, month, title)
+
+# Dashboard views; only the selected one is computed and rendered
+DASHBOARD_VIEWS = ["Overview", "Details", "Symbol Analysis", "Funding & Transaction"]
+CHART_VIEWS = ["💹 Futures P&L", "💰 Spot P&L", "📊 Floating P&L"]
+
+# Fungsi untuk membuat chart Daily & Cumulative P&L per market (di-cache per versi data)
+@st.cache_data(show_spinner=False, max_entries=16)
+def cached_pnl_chart(market, version, _daily, title):
+    df_chart, stats = analytics.market_pnl(_daily)
+    
+    fig = go.Figure()
+    
+    # Daily P&L bars
+    colors = ['#10b981' if x > 0 else '#ef4444' for x in df_chart['pnl']]
+    fig.add_trace(go.Bar(
+        x=df_chart['date'],
+        y=df_chart['pnl'],
+        name='Daily P&L',
+        marker_color=colors,
+        yaxis='y'
+    ))
+    
+    # Cumulative P&L line
+    fig.add_trace(go.Scatter(
+        x=df_chart['date'],
+        y=df_chart['cumulative_pnl'],
+        name='Cumulative P&L',
+        line=dict(color='#fbbf24', width=3),
+        yaxis='y2'
+    ))
+    
+    fig.update_layout(
+        title=title,
+        xaxis_title="Date",
+        yaxis=dict(title="Daily P&L (USD)", side='left'),
+        yaxis2=dict(title="Cumulative P&L (USD)", side='right', overlaying='y'),
+        plot_bgcolor='#1e1e2e',
+        paper_bgcolor='#1e1e2e',
+        font_color='#ffffff',
+        hovermode='x unified',
+        height=400,
+        legend=dict(x=0.01, y=0.99)
+    )
+    
+    return fig, stats
+
+# Fungsi untuk chart PNL by Symbol
+@st.cache_data(show_spinner=False, max_entries=4)
+def cached_symbol_chart(version, _symbol_stats):
+    fig = px.bar(_symbol_stats.reset_index(), x='symbol', y='Total PNL',
+                color='Total PNL',
+                color_continuous_scale=['red', 'yellow', 'green'],
+                title="PNL by Symbol")
+    fig.update_layout(
+        plot_bgcolor='#1e1e2e',
+        paper_bgcolor='#1e1e2e',
+        font_color='#ffffff'
+    )
+    return fig
+
+# Fungsi untuk chart Daily Trading Volume; None kalau belum ada volume
+@st.cache_data(show_spinner=False, max_entries=4)
+def cached_volume_chart(version, _daily_rollup):
+    daily_volume = analytics.daily_volume(_daily_rollup)
+    if len(daily_volume) == 0:
+        return None
+    
+    fig = px.line(daily_volume, x='date', y='volume',
+                 title="Daily Trading Volume")
+    fig.update_layout(
+        plot_bgcolor='#1e1e2e',
+        paper_bgcolor='#1e1e2e',
+        font_color='#ffffff'
+    )
+    return daily_volume['volume'].sum(), fig
+
+# Fungsi untuk chart Rolling 7/30-day P&L
+@st.cache_data(show_spinner=False, max_entries=4)
+def cached_rolling_chart(version, _series):
+    fig = go.Figure()
+    for window, color in zip(analytics.RISK_WINDOWS, ['#60a5fa', '#fbbf24']):
+        fig.add_trace(go.Scatter(
+            x=_series['date'],
+            y=_series[f"pnl_{window}d"],
+            mode='lines',
+            name=f"{window}-day P&L",
+            line=dict(color=color, width=2)
+        ))
+    fig.update_layout(
+        title="Rolling P&L",
+        xaxis_title="Date",
+        yaxis_title="P&L (USD)",
+        plot_bgcolor='#1e1e2e',
+        paper_bgcolor='#1e1e2e',
+        font_color='#ffffff',
+        hovermode='x unified',
+        height=350
+    )
+    return fig
+
+# Export CSV/Parquet dibuat hanya saat tombol download diklik, di-cache per versi data
+@st.cache_data(show_spinner=False, max_entries=16)
+def export_store(store, fmt, signature):
+    return storage.export_bytes(backend, store, fmt)
+
+def render_download_buttons(store, label, file_prefix):
+    signature = backend.signature(store)
+    stamp = datetime.now().strftime('%Y%m%d')
+    for fmt in ['csv', 'parquet']:
+        st.download_button(
+            label=f"📥 Download {label} {fmt.upper() if fmt == 'csv' else fmt.title()}",
+            data=lambda fmt=fmt: export_store(store, fmt, signature),
+            file_name=f"{file_prefix}_{stamp}.{fmt}",
+            mime=storage.EXPORT_MIME_TYPES[fmt],
+            key=f"download_{store}_{fmt}"
+        )
+
+# Tabel dengan pagination: hanya halaman yang dipilih yang dikirim ke browser
+PAGE_SIZES = [25, 50, 100, 250]
+
+def _reset_page(page_key):
+    st.session_state[page_key] = 1
+
+def render_paged_table(store, key):
+    schema = storage.SCHEMAS[store]
+    date_column = storage.PAGE_DATE_COLUMNS[store]
+    columns = list(schema)
+    page_key = f"{key}_page"
+    # Any filter/sort change starts again from the first page
+    reset = dict(on_change=_reset_page, args=(page_key,))
+    
+    col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 1, 1])
+    with col1:
+        date_range = st.date_input("Date range", value=(), key=f"{key}_dates", **reset)
+    with col2:
+        if 'symbol' in schema:
+            symbols = tuple(st.multiselect("Symbol", load_symbols(store), key=f"{key}_symbols", **reset))
+        else:
+            symbols = ()
+    with col3:
+        sort_by = st.selectbox("Sort by", columns, index=columns.index(date_column),
+                               key=f"{key}_sort", **reset)
+    with col4:
+        order = st.selectbox("Order", ["Desc", "Asc"], key=f"{key}_order", **reset)
+    with col5:
+        page_size = st.selectbox("Rows", PAGE_SIZES, index=1, key=f"{key}_size", **reset)
+    
+    start = date_range[0].isoformat() if len(date_range) > 0 else None
+    end = date_range[1].isoformat() if len(date_range) > 1 else None
+    total = load_page_count(store, start, end, symbols)
+    if total == 0:
+        st.info("Tidak ada data untuk filter ini")
+        return
+    
+    # Keep the page in range when filters shrink the result
+    pages = -(-total // page_size)
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    
+    page = st.session_state.get(page_key, 1)
+    offset = (page - 1) * page_size
+    df = load_page(store, start, end, symbols, sort_by, order == "Desc", offset, page_size).copy()
+    for column, kind in schema.items():
+        if kind == 'datetime':
+            df[column] = df[column].dt.strftime('%Y-%m-%d')
+    st.dataframe(df, use_container_width=True, hide_index=True)
+    
+    col_page, col_info = st.columns([1, 3])
+    with col_page:
+        st.number_input("Page", min_value=1, max_value=pages, step=1, key=page_key)
+    with col_info:
+        st.caption(f"Menampilkan {offset + 1}-{offset + len(df)} dari {total} baris (halaman {page}/{pages})")
+
 # Main App
 def main():
+    global backend
     check_password()
     
+    # Storage milik akun yang login
+    if st.session_state.get('account') not in ACCOUNTS:
+        st.session_state.account = next(iter(ACCOUNTS))
+    backend = get_storage_backend(STORAGE_MODE, st.session_state.account)
+    
     # Load data
-    data = load_data()
-    futures_data = load_futures_data()
     initial_balance = load_balance_data()
     holdings_data = load_holdings_data()
     
+    # Daily PNL/volume rollup shared by every Dashboard view
+    version = trades_version()
+    daily_rollup = load_rollup('day')
+    
     # Sidebar untuk navigasi
     st.sidebar.title("📊 Trading Journal")
     
@@ -486,6 +820,11 @@ def main():
             st.session_state.mobile_view = mobile_mode
             st.rerun()
     
+    if len(ACCOUNTS) > 1:
+        st.sidebar.caption(f"🗂️ Account: **{st.session_state.account}**")
+    
+    render_price_feed_status()
+    
     # Show user role
     if st.session_state.user_role == "admin":
         st.sidebar.success("👤 Logged in as: **Admin**")
@@ -499,24 +838,29 @@ def main():
     if st.sidebar.button("🚪 Logout"):
         st.session_state.authenticated = False
         st.session_state.user_role = None
+        st.session_state.account = None
         st.rerun()
     
     if page == "Dashboard":
+        spot_daily = analytics.for_market(daily_rollup, 'spot')
+        futures_daily = analytics.for_market(daily_rollup, 'futures')
+        
         # Calculate statistics FIRST
-        stats = calculate_statistics(data, futures_data)
+        stats = load_statistics()
         
         # Calculate total unrealized P&L from holdings
-        total_unrealized_pnl = 0
-        if holdings_data:
-            for holding in holdings_data:
-                if holding.get('status') == 'open':
-                    total_unrealized_pnl += holding.get('unrealized_pnl', 0)
+        total_unrealized_pnl = analytics.holdings_totals(load_open_holdings())['unrealized_pnl']
         
-        # Calculate portfolio value
+        # Calculate portfolio value from the running balance (trades + cash-flow ledger)
+        df_portfolio = load_portfolio_history(initial_balance)
+        portfolio = analytics.portfolio_summary(df_portfolio, initial_balance, total_unrealized_pnl)
+        net_deposits = portfolio['net_deposits']
         realized_pnl = stats['net_pnl']
         total_pnl = realized_pnl + total_unrealized_pnl
-        current_portfolio = initial_balance + total_pnl
-        portfolio_change_pct = ((total_pnl / initial_balance) * 100) if initial_balance > 0 else 0
+        current_portfolio = portfolio['value']
+        # Time-weighted, so deposits and withdrawals don't count as performance
+        returns = load_returns(initial_balance, current_portfolio)
+        portfolio_change = f"{returns['twr'] * 100:+.2f}%" if returns['twr'] is not None else None
         
         # PORTFOLIO VALUE PREVIEW - MOVED TO TOP
         st.markdown('<div class="portfolio-preview-card">', unsafe_allow_html=True)
@@ -527,20 +871,22 @@ def main():
             # Mobile: 2 columns layout
             preview_col1, preview_col2 = st.columns(2)
             with preview_col1:
-                st.metric("💰 Initial Balance", f"${initial_balance:,.2f}")
+                st.metric("💰 Initial Balance", f"${initial_balance:,.2f}",
+                         delta=f"{net_deposits:+,.2f} net deposits" if net_deposits else None)
                 st.metric("📈 Unrealized P&L", f"${total_unrealized_pnl:,.2f}",
                          delta_color="normal" if total_unrealized_pnl >= 0 else "inverse")
             with preview_col2:
                 st.metric("📊 Realized P&L", f"${realized_pnl:,.2f}", 
                          delta_color="normal" if realized_pnl >= 0 else "inverse")
                 st.metric("💼 Portfolio Value", f"${current_portfolio:,.2f}", 
-                         delta=f"{portfolio_change_pct:+.2f}%",
+                         delta=portfolio_change,
                          delta_color="normal" if total_pnl >= 0 else "inverse")
         else:
             # Desktop: 4 columns layout
             preview_col1, preview_col2, preview_col3, preview_col4 = st.columns(4)
             with preview_col1:
-                st.metric("💰 Initial Balance", f"${initial_balance:,.2f}")
+                st.metric("💰 Initial Balance", f"${initial_balance:,.2f}",
+                         delta=f"{net_deposits:+,.2f} net deposits" if net_deposits else None)
             with preview_col2:
                 st.metric("📊 Realized P&L", f"${realized_pnl:,.2f}", 
                          delta_color="normal" if realized_pnl >= 0 else "inverse")
@@ -549,9 +895,22 @@ def main():
                          delta_color="normal" if total_unrealized_pnl >= 0 else "inverse")
             with preview_col4:
                 st.metric("💼 Portfolio Value", f"${current_portfolio:,.2f}", 
-                         delta=f"{portfolio_change_pct:+.2f}%",
+                         delta=portfolio_change,
                          delta_color="normal" if total_pnl >= 0 else "inverse")
         
+        # Returns: TWR ignores the timing of cash flows, MWR (IRR) weights them
+        mwr = returns['mwr']
+        return_col1, return_col2, return_col3 = st.columns(3)
+        with return_col1:
+            st.metric("⏱️ Time-Weighted Return", portfolio_change or "–",
+                     help=f"Over {returns['days']} days")
+        with return_col2:
+            twr_annualized = returns['twr_annualized']
+            st.metric("📅 Annualized TWR", f"{twr_annualized * 100:+.2f}%" if twr_annualized is not None else "–")
+        with return_col3:
+            st.metric("💵 Money-Weighted Return (IRR)", f"{mwr * 100:+.2f}%" if mwr is not None else "–",
+                     help="Annualized internal rate of return of deposits, withdrawals and current equity")
+        
         st.markdown('</div>', unsafe_allow_html=True)
         
         st.divider()
@@ -559,59 +918,9 @@ def main():
         # PORTFOLIO HISTORY CHART - NEW
         st.subheader("📈 Portfolio Performance History")
         
-        # Combine all data for portfolio history
-        portfolio_history = []
-        
-        # Get all dates from spot and futures
-        all_dates = set()
-        if data:
-            df_spot = pd.DataFrame(data)
-            df_spot['date'] = pd.to_datetime(df_spot['date'])
-            all_dates.update(df_spot['date'].dt.date.tolist())
+        price_history = load_price_history()
         
-        if futures_data:
-            df_futures = pd.DataFrame(futures_data)
-            df_futures['date'] = pd.to_datetime(df_futures['date'])
-            all_dates.update(df_futures['date'].dt.date.tolist())
-        
-        if all_dates:
-            # Sort dates
-            sorted_dates = sorted(list(all_dates))
-            
-            # Calculate cumulative portfolio value
-            cumulative_pnl = 0
-            for date in sorted_dates:
-                date_dt = pd.Timestamp(date)
-                
-                # Get PNL for this date from spot
-                if data:
-                    df_spot = pd.DataFrame(data)
-                    df_spot['date'] = pd.to_datetime(df_spot['date'])
-                    spot_pnl = df_spot[df_spot['date'].dt.date == date]['pnl'].sum()
-                else:
-                    spot_pnl = 0
-                
-                # Get PNL for this date from futures
-                if futures_data:
-                    df_futures = pd.DataFrame(futures_data)
-                    df_futures['date'] = pd.to_datetime(df_futures['date'])
-                    futures_pnl = df_futures[df_futures['date'].dt.date == date]['pnl'].sum()
-                else:
-                    futures_pnl = 0
-                
-                daily_pnl = spot_pnl + futures_pnl
-                cumulative_pnl += daily_pnl
-                
-                portfolio_history.append({
-                    'date': date,
-                    'daily_pnl': daily_pnl,
-                    'cumulative_pnl': cumulative_pnl,
-                    'portfolio_value': initial_balance + cumulative_pnl
-                })
-            
-            # Create DataFrame
-            df_portfolio = pd.DataFrame(portfolio_history)
-            
+        if len(df_portfolio) > 0:
             # Create line chart
             fig_portfolio = go.Figure()
             
@@ -627,6 +936,16 @@ def main():
                 fillcolor='rgba(16, 185, 129, 0.1)'
             ))
             
+            # Realized + unrealized equity, once holdings have price history
+            if len(price_history) > 0:
+                fig_portfolio.add_trace(go.Scatter(
+                    x=df_portfolio['date'],
+                    y=df_portfolio['equity'],
+                    mode='lines',
+                    name='Equity (incl. Unrealized)',
+                    line=dict(color='#60a5fa', width=2, dash='dot')
+                ))
+            
             # Add initial balance reference line
             fig_portfolio.add_hline(
                 y=initial_balance,
@@ -649,39 +968,60 @@ def main():
             
             st.plotly_chart(fig_portfolio, use_container_width=True)
             
+            # Peak/Lowest/Best/Worst from the same history frame
+            max_portfolio = portfolio['peak']
+            min_portfolio = portfolio['lowest']
+            best_day = portfolio['best_day']
+            worst_day = portfolio['worst_day']
+            
             # Show stats - Responsive
             if st.session_state.get('mobile_view', False):
                 # Mobile: 2 columns
                 col_stat1, col_stat2 = st.columns(2)
                 with col_stat1:
-                    max_portfolio = df_portfolio['portfolio_value'].max()
                     st.metric("Peak Portfolio", f"${max_portfolio:,.0f}")
-                    best_day = df_portfolio.loc[df_portfolio['daily_pnl'].idxmax()]
                     st.metric("Best Day", f"+${best_day['daily_pnl']:,.0f}", 
                              delta=best_day['date'].strftime('%m/%d'))
                 with col_stat2:
-                    min_portfolio = df_portfolio['portfolio_value'].min()
                     st.metric("Lowest Portfolio", f"${min_portfolio:,.0f}")
-                    worst_day = df_portfolio.loc[df_portfolio['daily_pnl'].idxmin()]
                     st.metric("Worst Day", f"${worst_day['daily_pnl']:,.0f}",
                              delta=worst_day['date'].strftime('%m/%d'))
             else:
                 # Desktop: 4 columns
                 col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
                 with col_stat1:
-                    max_portfolio = df_portfolio['portfolio_value'].max()
                     st.metric("Peak Portfolio", f"${max_portfolio:,.2f}")
                 with col_stat2:
-                    min_portfolio = df_portfolio['portfolio_value'].min()
                     st.metric("Lowest Portfolio", f"${min_portfolio:,.2f}")
                 with col_stat3:
-                    best_day = df_portfolio.loc[df_portfolio['daily_pnl'].idxmax()]
                     st.metric("Best Day", f"+${best_day['daily_pnl']:,.2f}", 
                              delta=best_day['date'].strftime('%Y-%m-%d'))
                 with col_stat4:
-                    worst_day = df_portfolio.loc[df_portfolio['daily_pnl'].idxmin()]
                     st.metric("Worst Day", f"${worst_day['daily_pnl']:,.2f}",
                              delta=worst_day['date'].strftime('%Y-%m-%d'))
+            
+            # RISK METRICS
+            risk = load_risk_metrics(initial_balance)
+            st.subheader("⚠️ Risk Metrics")
+            risk_values = [
+                ("Max Drawdown", f"${risk['max_drawdown']:,.2f}",
+                 f"-{risk['max_drawdown_pct']:.2f}%" if risk['max_drawdown_pct'] > 0 else None),
+                ("Drawdown Duration", f"{risk['drawdown_days']} days", None),
+                ("Sharpe Ratio", f"{risk['sharpe_ratio']:.2f}", None),
+                ("Sortino Ratio", f"{risk['sortino_ratio']:.2f}", None),
+                ("Win / Loss Streak", f"{risk['longest_win_streak']} / {risk['longest_loss_streak']} days", None),
+                ("7-Day P&L", f"${risk['pnl_7d']:,.2f}", None),
+                ("30-Day P&L", f"${risk['pnl_30d']:,.2f}", None),
+            ]
+            # Mobile: 2 columns, desktop: 4 columns
+            per_row = 2 if st.session_state.get('mobile_view', False) else 4
+            for row_start in range(0, len(risk_values), per_row):
+                for col, (label, value, delta) in zip(st.columns(per_row), risk_values[row_start:row_start + per_row]):
+                    with col:
+                        st.metric(label, value, delta=delta)
+            
+            with st.expander("📉 Rolling 7/30-Day P&L", expanded=False):
+                st.plotly_chart(cached_rolling_chart(portfolio_version(initial_balance), risk['series']), use_container_width=True)
         else:
             st.info("📊 Belum ada data trading untuk menampilkan history portfolio")
         
@@ -733,12 +1073,11 @@ def main():
         # Holdings Data Management
         st.subheader("📊 Holdings Data")
         if holdings_data:
-            open_pos = len([h for h in holdings_data if h.get('status') == 'open'])
-            closed_pos = len([h for h in holdings_data if h.get('status') == 'closed'])
+            open_pos = len(load_holdings_data('open'))
+            closed_pos = len(load_holdings_data('closed'))
             st.info(f"Open Positions: **{open_pos}** | Closed Positions: **{closed_pos}**")
             
-            df_holdings = pd.DataFrame(holdings_data)
-            st.dataframe(df_holdings, use_container_width=True, hide_index=True)
+            render_paged_table('holdings', "dashboard_holdings")
             
             # Admin only buttons
             if st.session_state.user_role == "admin":
@@ -755,13 +1094,7 @@ def main():
                             st.warning("Klik sekali lagi untuk konfirmasi")
                 
                 with col2:
-                    csv_holdings = df_holdings.to_csv(index=False)
-                    st.download_button(
-                        label="📥 Download Holdings CSV",
-                        data=csv_holdings,
-                        file_name=f"holdings_data_{datetime.now().strftime('%Y%m%d')}.csv",
-                        mime="text/csv"
-                    )
+                    render_download_buttons('holdings', "Holdings", "holdings_data")
         else:
             st.info("Belum ada data holdings")
         
@@ -812,10 +1145,11 @@ def main():
         
         st.divider()
         
-        # Tabs
-        tab1, tab2, tab3, tab4 = st.tabs(["Overview", "Details", "Symbol Analysis", "Funding & Transaction"])
+        # View selector (only the active view is built)
+        dashboard_view = st.radio("View", DASHBOARD_VIEWS, horizontal=True,
+                                  key="dashboard_view", label_visibility="collapsed")
         
-        with tab1:
+        if dashboard_view == "Overview":
             st.subheader("📅 Daily PNL")
             
             # Month/Year selector
@@ -833,29 +1167,28 @@ def main():
             
             # Tabel Futures (di atas)
             st.markdown("### 📊 Daily PNL (Futures)")
-            if futures_data:
-                df_futures = pd.DataFrame(futures_data)
-                df_futures['date'] = pd.to_datetime(df_futures['date'])
-                
-                # Filter by selected month and year
-                df_futures_filtered = df_futures[
-                    (df_futures['date'].dt.year == selected_year) & 
-                    (df_futures['date'].dt.month == selected_month)
-                ].copy()
+            if len(futures_daily) > 0:
+                # Only the selected month is read from storage
+                df_futures_filtered = load_month_trades('futures', selected_year, selected_month)
                 
                 if len(df_futures_filtered) > 0:
-                    # Format display
-                    df_futures_display = df_futures_filtered.copy()
+                    # One row per day from the month's trades
+                    df_futures_display = analytics.futures_daily_table(df_futures_filtered)
                     df_futures_display['date'] = df_futures_display['date'].dt.strftime('%Y-%m-%d')
                     df_futures_display['pnl'] = df_futures_display['pnl'].apply(lambda x: f"+{x:.2f}" if x > 0 else f"{x:.2f}")
-                    
-                    # Reorder columns
-                    display_cols = ['date', 'pnl', 'notes']
-                    df_futures_display = df_futures_display[display_cols]
-                    df_futures_display.columns = ['Trading Date', 'P&L (USD)', 'Notes']
+                    df_futures_display.columns = ['Trading Date', 'Trades', 'P&L (USD)', 'Fees', 'Funding', 'Volume']
                     
                     st.dataframe(df_futures_display, use_container_width=True, hide_index=True)
                     
+                    with st.expander("📋 Futures Trades", expanded=False):
+                        df_futures_trades = df_futures_filtered.copy()
+                        df_futures_trades['date'] = df_futures_trades['date'].dt.strftime('%Y-%m-%d')
+                        display_cols = ['date', 'symbol', 'side', 'size', 'leverage', 'fees', 'funding', 'pnl', 'notes']
+                        df_futures_trades = df_futures_trades[display_cols]
+                        df_futures_trades.columns = ['Trading Date', 'Symbol', 'Side', 'Size (USD)', 'Leverage',
+                                                     'Fees', 'Funding', 'Net P&L', 'Notes']
+                        st.dataframe(df_futures_trades, use_container_width=True, hide_index=True)
+                    
                     # Summary
                     total_futures_pnl = df_futures_filtered['pnl'].sum()
                     st.metric("Total Futures P&L", f"{total_futures_pnl:.2f} USD", 
@@ -870,8 +1203,10 @@ def main():
             
             # Calendar View - Futures
             st.markdown("### 📅 Calendar View - Futures Trading")
-            if futures_data:
-                fig_futures = create_calendar_view(futures_data, selected_year, selected_month, "Futures Trading Calendar")
+            if len(futures_daily) > 0:
+                fig_futures = cached_calendar_view('futures', selected_year, selected_month, version,
+                                                   load_month_daily_pnl('futures', selected_year, selected_month),
+                                                   "Futures Trading Calendar")
                 if fig_futures:
                     st.plotly_chart(fig_futures, use_container_width=True)
                 else:
@@ -883,8 +1218,10 @@ def main():
             
             # Calendar View - Spot
             st.markdown("### 📅 Calendar View - Spot Trading")
-            if data:
-                fig_spot = create_calendar_view(data, selected_year, selected_month, "Spot Trading Calendar")
+            if len(spot_daily) > 0:
+                fig_spot = cached_calendar_view('spot', selected_year, selected_month, version,
+                                                load_month_daily_pnl('spot', selected_year, selected_month),
+                                                "Spot Trading Calendar")
                 if fig_spot:
                     st.plotly_chart(fig_spot, use_container_width=True)
                 else:
@@ -892,144 +1229,56 @@ def main():
             else:
                 st.info("Belum ada data spot")
         
-        with tab2:
+        elif dashboard_view == "Details":
             st.subheader("📋 Trading History")
             
             # CHART SECTION - NEW
             st.markdown("### 📈 Performance Charts")
             
-            # Create tabs for different charts
-            chart_tab1, chart_tab2, chart_tab3 = st.tabs(["💹 Futures P&L", "💰 Spot P&L", "📊 Floating P&L"])
+            # Chart selector
+            chart_view = st.radio("Chart", CHART_VIEWS, horizontal=True,
+                                  key="chart_view", label_visibility="collapsed")
             
-            with chart_tab1:
+            if chart_view == "💹 Futures P&L":
                 st.markdown("#### Futures Trading Performance")
-                if futures_data:
-                    df_futures_chart = pd.DataFrame(futures_data)
-                    df_futures_chart['date'] = pd.to_datetime(df_futures_chart['date'])
-                    df_futures_chart = df_futures_chart.sort_values('date')
-                    
-                    # Calculate cumulative
-                    df_futures_chart['cumulative_pnl'] = df_futures_chart['pnl'].cumsum()
-                    
-                    # Create chart
-                    fig_futures = go.Figure()
-                    
-                    # Daily P&L bars
-                    colors = ['#10b981' if x > 0 else '#ef4444' for x in df_futures_chart['pnl']]
-                    fig_futures.add_trace(go.Bar(
-                        x=df_futures_chart['date'],
-                        y=df_futures_chart['pnl'],
-                        name='Daily P&L',
-                        marker_color=colors,
-                        yaxis='y'
-                    ))
-                    
-                    # Cumulative P&L line
-                    fig_futures.add_trace(go.Scatter(
-                        x=df_futures_chart['date'],
-                        y=df_futures_chart['cumulative_pnl'],
-                        name='Cumulative P&L',
-                        line=dict(color='#fbbf24', width=3),
-                        yaxis='y2'
-                    ))
-                    
-                    fig_futures.update_layout(
-                        title="Futures: Daily & Cumulative P&L",
-                        xaxis_title="Date",
-                        yaxis=dict(title="Daily P&L (USD)", side='left'),
-                        yaxis2=dict(title="Cumulative P&L (USD)", side='right', overlaying='y'),
-                        plot_bgcolor='#1e1e2e',
-                        paper_bgcolor='#1e1e2e',
-                        font_color='#ffffff',
-                        hovermode='x unified',
-                        height=400,
-                        legend=dict(x=0.01, y=0.99)
-                    )
-                    
+                if len(futures_daily) > 0:
+                    fig_futures, futures_stats = cached_pnl_chart('futures', version, futures_daily,
+                                                                  "Futures: Daily & Cumulative P&L")
                     st.plotly_chart(fig_futures, use_container_width=True)
                     
                     # Stats
                     col_f1, col_f2, col_f3 = st.columns(3)
                     with col_f1:
-                        total_futures = df_futures_chart['pnl'].sum()
-                        st.metric("Total Futures P&L", f"${total_futures:,.2f}")
+                        st.metric("Total Futures P&L", f"${futures_stats['total']:,.2f}")
                     with col_f2:
-                        avg_futures = df_futures_chart['pnl'].mean()
-                        st.metric("Average Daily P&L", f"${avg_futures:,.2f}")
+                        st.metric("Average Daily P&L", f"${futures_stats['average']:,.2f}")
                     with col_f3:
-                        win_rate_futures = (df_futures_chart['pnl'] > 0).sum() / len(df_futures_chart) * 100
-                        st.metric("PNL Rate", f"{win_rate_futures:.1f}%")
+                        st.metric("PNL Rate", f"{futures_stats['win_rate']:.1f}%")
                 else:
                     st.info("Belum ada data futures untuk ditampilkan")
             
-            with chart_tab2:
+            elif chart_view == "💰 Spot P&L":
                 st.markdown("#### Spot Trading Performance")
-                if data:
-                    df_spot_chart = pd.DataFrame(data)
-                    df_spot_chart['date'] = pd.to_datetime(df_spot_chart['date'])
-                    
-                    # Group by date
-                    df_spot_daily = df_spot_chart.groupby('date')['pnl'].sum().reset_index()
-                    df_spot_daily = df_spot_daily.sort_values('date')
-                    
-                    # Calculate cumulative
-                    df_spot_daily['cumulative_pnl'] = df_spot_daily['pnl'].cumsum()
-                    
-                    # Create chart
-                    fig_spot = go.Figure()
-                    
-                    # Daily P&L bars
-                    colors = ['#10b981' if x > 0 else '#ef4444' for x in df_spot_daily['pnl']]
-                    fig_spot.add_trace(go.Bar(
-                        x=df_spot_daily['date'],
-                        y=df_spot_daily['pnl'],
-                        name='Daily P&L',
-                        marker_color=colors,
-                        yaxis='y'
-                    ))
-                    
-                    # Cumulative P&L line
-                    fig_spot.add_trace(go.Scatter(
-                        x=df_spot_daily['date'],
-                        y=df_spot_daily['cumulative_pnl'],
-                        name='Cumulative P&L',
-                        line=dict(color='#fbbf24', width=3),
-                        yaxis='y2'
-                    ))
-                    
-                    fig_spot.update_layout(
-                        title="Spot: Daily & Cumulative P&L",
-                        xaxis_title="Date",
-                        yaxis=dict(title="Daily P&L (USD)", side='left'),
-                        yaxis2=dict(title="Cumulative P&L (USD)", side='right', overlaying='y'),
-                        plot_bgcolor='#1e1e2e',
-                        paper_bgcolor='#1e1e2e',
-                        font_color='#ffffff',
-                        hovermode='x unified',
-                        height=400,
-                        legend=dict(x=0.01, y=0.99)
-                    )
-                    
+                if len(spot_daily) > 0:
+                    fig_spot, spot_stats = cached_pnl_chart('spot', version, spot_daily,
+                                                            "Spot: Daily & Cumulative P&L")
                     st.plotly_chart(fig_spot, use_container_width=True)
                     
                     # Stats
                     col_s1, col_s2, col_s3 = st.columns(3)
                     with col_s1:
-                        total_spot = df_spot_daily['pnl'].sum()
-                        st.metric("Total Spot P&L", f"${total_spot:,.2f}")
+                        st.metric("Total Spot P&L", f"${spot_stats['total']:,.2f}")
                     with col_s2:
-                        avg_spot = df_spot_daily['pnl'].mean()
-                        st.metric("Average Daily P&L", f"${avg_spot:,.2f}")
+                        st.metric("Average Daily P&L", f"${spot_stats['average']:,.2f}")
                     with col_s3:
-                        win_rate_spot = (df_spot_daily['pnl'] > 0).sum() / len(df_spot_daily) * 100
-                        st.metric("PNL Rate", f"{win_rate_spot:.1f}%")
+                        st.metric("PNL Rate", f"{spot_stats['win_rate']:.1f}%")
                 else:
                     st.info("Belum ada data spot untuk ditampilkan")
             
-            with chart_tab3:
+            else:
                 st.markdown("#### Floating Positions Performance")
                 if holdings_data:
-                    open_holdings = [h for h in holdings_data if h.get('status') == 'open']
+                    open_holdings = load_open_holdings()
                     if open_holdings:
                         df_float = pd.DataFrame(open_holdings)
                         
@@ -1059,16 +1308,14 @@ def main():
                         st.plotly_chart(fig_float, use_container_width=True)
                         
                         # Stats
+                        float_totals = analytics.holdings_totals(open_holdings)
                         col_fl1, col_fl2, col_fl3 = st.columns(3)
                         with col_fl1:
-                            total_float = df_float['unrealized_pnl'].sum()
-                            st.metric("Total Unrealized P&L", f"${total_float:,.2f}")
+                            st.metric("Total Unrealized P&L", f"${float_totals['unrealized_pnl']:,.2f}")
                         with col_fl2:
-                            profitable = (df_float['unrealized_pnl'] > 0).sum()
-                            st.metric("Profitable Positions", f"{profitable}/{len(df_float)}")
+                            st.metric("Profitable Positions", f"{float_totals['profitable']}/{float_totals['positions']}")
                         with col_fl3:
-                            total_value = (df_float['quantity'] * df_float['current_price']).sum()
-                            st.metric("Total Holdings Value", f"${total_value:,.2f}")
+                            st.metric("Total Holdings Value", f"${float_totals['current_value']:,.2f}")
                     else:
                         st.info("Tidak ada posisi floating terbuka")
                 else:
@@ -1082,7 +1329,7 @@ def main():
             # Holdings/Open Positions
             st.markdown("#### 📊 Open Positions (Floating)")
             if holdings_data:
-                open_holdings = [h for h in holdings_data if h.get('status') == 'open']
+                open_holdings = load_open_holdings()
                 if open_holdings:
                     df_holdings = pd.DataFrame(open_holdings)
                     # Format display
@@ -1092,7 +1339,7 @@ def main():
                     st.dataframe(df_holdings_display, use_container_width=True, hide_index=True)
                     
                     # Summary
-                    total_value = df_holdings['quantity'].sum() * df_holdings['current_price'].mean()
+                    total_value = analytics.holdings_totals(open_holdings)['current_value']
                     st.metric("Total Holdings Value", f"${total_value:,.2f} USD")
                 else:
                     st.info("Tidak ada posisi terbuka")
@@ -1103,10 +1350,8 @@ def main():
             
             # Futures History
             st.markdown("#### Futures Trading")
-            if futures_data:
-                df_futures = pd.DataFrame(futures_data)
-                df_futures['date'] = pd.to_datetime(df_futures['date']).dt.strftime('%Y-%m-%d')
-                st.dataframe(df_futures, use_container_width=True, hide_index=True)
+            if len(futures_daily) > 0:
+                render_paged_table('futures', "details_futures")
             else:
                 st.info("Belum ada data futures")
             
@@ -1114,85 +1359,67 @@ def main():
             
             # Spot History (Closed Trades)
             st.markdown("#### Spot Trading (Closed)")
-            if data:
-                df = pd.DataFrame(data)
-                df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
-                st.dataframe(df, use_container_width=True, hide_index=True)
+            if len(spot_daily) > 0:
+                render_paged_table('spot', "details_spot")
             else:
                 st.info("Belum ada data spot")
         
-        with tab3:
+        elif dashboard_view == "Symbol Analysis":
             st.subheader("📊 Symbol Analysis")
             
-            # Combine data
-            all_data = []
-            if data:
-                df_spot = pd.DataFrame(data)
-                df_spot['type'] = 'Spot'
-                all_data.append(df_spot)
-            if futures_data:
-                df_futures = pd.DataFrame(futures_data)
-                if 'symbol' not in df_futures.columns:
-                    df_futures['symbol'] = 'Futures'
-                df_futures['type'] = 'Futures'
-                all_data.append(df_futures)
-            
-            if all_data:
-                df_combined = pd.concat(all_data, ignore_index=True)
+            if len(daily_rollup) > 0:
+                breakdowns = load_symbol_analytics(version)
+                labels = {'total_pnl': 'Total PNL', 'avg_pnl': 'Avg PNL', 'trades': 'Trades',
+                          'win_rate': 'Win Rate (%)', 'volume': 'Volume',
+                          'best_trade': 'Best Trade', 'worst_trade': 'Worst Trade'}
                 
-                if 'symbol' in df_combined.columns:
-                    symbol_stats = df_combined.groupby('symbol').agg({
-                        'pnl': ['sum', 'mean', 'count']
-                    }).round(2)
-                    symbol_stats.columns = ['Total PNL', 'Avg PNL', 'Trades']
+                breakdown = st.radio("Breakdown", ["Symbol", "Market", "Month"], horizontal=True,
+                                     key="symbol_breakdown")
+                if breakdown == "Symbol":
+                    symbol_stats = breakdowns['symbol'].round(2).rename(columns=labels)
                     st.dataframe(symbol_stats, use_container_width=True)
                     
                     # Chart
-                    fig = px.bar(symbol_stats.reset_index(), x='symbol', y='Total PNL',
-                                color='Total PNL',
-                                color_continuous_scale=['red', 'yellow', 'green'],
-                                title="PNL by Symbol")
-                    fig.update_layout(
-                        plot_bgcolor='#1e1e2e',
-                        paper_bgcolor='#1e1e2e',
-                        font_color='#ffffff'
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+                    st.plotly_chart(cached_symbol_chart(version, symbol_stats), use_container_width=True)
+                elif breakdown == "Market":
+                    st.dataframe(breakdowns['market'].round(2).rename(columns=labels), use_container_width=True)
+                else:
+                    month_symbol = st.selectbox("Symbol", ["All"] + list(breakdowns['symbol'].index),
+                                                key="symbol_breakdown_symbol")
+                    if month_symbol == "All":
+                        by_month = breakdowns['month']
+                    else:
+                        by_month = breakdowns['month_symbol'].xs(month_symbol, level='symbol')
+                    st.dataframe(by_month.round(2).rename(columns=labels), use_container_width=True)
             else:
                 st.info("Belum ada data")
         
-        with tab4:
+        else:
             st.subheader("💰 Funding & Transaction Summary")
             
-            # Combine data
-            all_data = []
-            if data:
-                df_spot = pd.DataFrame(data)
-                all_data.append(df_spot)
-            if futures_data:
-                df_futures = pd.DataFrame(futures_data)
-                if 'volume' in df_futures.columns:
-                    all_data.append(df_futures)
+            # Ledger totals per type, with the fees/funding recorded on futures trades
+            cash = analytics.cash_summary(load_ledger_frame(), load_futures_frame())
             
-            if all_data:
-                df_combined = pd.concat(all_data, ignore_index=True)
+            col_cf1, col_cf2, col_cf3, col_cf4 = st.columns(4)
+            with col_cf1:
+                st.metric("Deposits", f"${cash['deposits']:,.2f}")
+            with col_cf2:
+                st.metric("Withdrawals", f"${cash['withdrawals']:,.2f}")
+            with col_cf3:
+                st.metric("Fees", f"${cash['fees']:,.2f}",
+                         help=f"Ledger ${cash['ledger_fees']:,.2f} + futures trades ${cash['futures_fees']:,.2f}")
+            with col_cf4:
+                st.metric("Funding", f"${cash['funding']:,.2f}",
+                         help=f"Ledger ${cash['ledger_funding']:,.2f} + futures trades ${cash['futures_funding']:,.2f}")
+            
+            volume_chart = cached_volume_chart(version, daily_rollup)
+            
+            if volume_chart:
+                total_volume, fig = volume_chart
+                st.metric("Total Trading Volume", f"{total_volume:,.2f} USD")
                 
-                if 'volume' in df_combined.columns:
-                    total_volume = df_combined['volume'].sum()
-                    st.metric("Total Trading Volume", f"{total_volume:,.2f} USD")
-                    
-                    # Volume over time
-                    df_combined['date'] = pd.to_datetime(df_combined['date'])
-                    daily_volume = df_combined.groupby('date')['volume'].sum().reset_index()
-                    
-                    fig = px.line(daily_volume, x='date', y='volume',
-                                 title="Daily Trading Volume")
-                    fig.update_layout(
-                        plot_bgcolor='#1e1e2e',
-                        paper_bgcolor='#1e1e2e',
-                        font_color='#ffffff'
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+                # Volume over time
+                st.plotly_chart(fig, use_container_width=True)
             else:
                 st.info("Belum ada data")
     
@@ -1234,8 +1461,7 @@ def main():
                     "timestamp": datetime.now().isoformat()
                 }
                 
-                data.append(new_entry)
-                save_data(data)
+                append_data(new_entry)
                 st.success("✅ Entry berhasil disimpan!")
                 st.rerun()
     
@@ -1248,24 +1474,46 @@ def main():
         st.title("📝 Daily Trading Report Entry (Futures)")
         
         with st.form("futures_entry_form"):
-            trade_date = st.date_input("Trading Date", datetime.now())
-            pnl = st.number_input("P&L (USD)", step=0.01)
-            notes = st.text_area("Notes", placeholder="Trading notes for futures...")
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                trade_date = st.date_input("Trading Date", datetime.now())
+                symbol = st.text_input("Symbol/Pair", placeholder="e.g., BTCUSDT, ETHUSDT")
+                side = st.selectbox("Side", ["Long", "Short"])
+                size = st.number_input("Size (USD)", min_value=0.0, step=0.01)
+                leverage = st.number_input("Leverage", min_value=1.0, value=1.0, step=1.0)
+            
+            with col2:
+                gross_pnl = st.number_input("Gross P&L (USD)", step=0.01)
+                fees = st.number_input("Fees (USD)", min_value=0.0, step=0.01)
+                funding = st.number_input("Funding (USD)", step=0.01,
+                                          help="Positif = funding diterima, negatif = funding dibayar")
+                notes = st.text_area("Notes", placeholder="Trading notes for futures...")
+            
+            st.caption("P&L disimpan sebagai net: Gross P&L − Fees + Funding")
             
             submitted = st.form_submit_button("💾 Save Futures Entry", use_container_width=True)
             
             if submitted:
-                new_entry = {
-                    "date": trade_date.strftime("%Y-%m-%d"),
-                    "pnl": pnl,
-                    "notes": notes,
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-                futures_data.append(new_entry)
-                save_futures_data(futures_data)
-                st.success("✅ Futures entry berhasil disimpan!")
-                st.rerun()
+                if not symbol:
+                    st.error("❌ Symbol wajib diisi")
+                else:
+                    new_entry = {
+                        "date": trade_date.strftime("%Y-%m-%d"),
+                        "symbol": symbol,
+                        "side": side,
+                        "size": size,
+                        "leverage": leverage,
+                        "fees": fees,
+                        "funding": funding,
+                        "pnl": gross_pnl - fees + funding,
+                        "notes": notes,
+                        "timestamp": datetime.now().isoformat()
+                    }
+                    
+                    append_futures_data(new_entry)
+                    st.success("✅ Futures entry berhasil disimpan!")
+                    st.rerun()
     
     elif page == "Holdings (Floating)":
         # Check if user is admin
@@ -1321,7 +1569,7 @@ def main():
                 
                 if submitted and symbol and quantity > 0 and entry_price > 0:
                     new_holding = {
-                        "id": datetime.now().strftime("%Y%m%d%H%M%S"),
+                        "id": datetime.now().strftime("%Y%m%d%H%M%S%f"),
                         "symbol": symbol,
                         "quantity": quantity,
                         "entry_price": entry_price,
@@ -1333,8 +1581,7 @@ def main():
                         "timestamp": datetime.now().isoformat()
                     }
                     
-                    holdings_data.append(new_holding)
-                    save_holdings_data(holdings_data)
+                    upsert_holding(new_holding)
                     st.success("✅ Position berhasil ditambahkan!")
                     st.rerun()
         
@@ -1342,12 +1589,13 @@ def main():
             st.markdown("### Current Holdings")
             
             if holdings_data:
-                open_holdings = [h for h in holdings_data if h.get('status') == 'open']
+                open_holdings = load_holdings_data('open')
                 
                 if open_holdings:
                     # Summary cards
-                    total_cost = sum(h['quantity'] * h['entry_price'] for h in open_holdings)
-                    total_current = sum(h['quantity'] * h['current_price'] for h in open_holdings)
+                    totals = analytics.holdings_totals(open_holdings)
+                    total_cost = totals['cost_basis']
+                    total_current = totals['current_value']
                     total_unrealized = total_current - total_cost
                     
                     col1, col2, col3 = st.columns(3)
@@ -1361,6 +1609,50 @@ def main():
                     
                     st.divider()
                     
+                    # Batch mark-to-market: one price per symbol, applied to every open position at once
+                    with st.expander("⚡ Batch Mark-to-Market", expanded=False):
+                        st.info("💡 Edit New Price per symbol or upload a CSV/Parquet file with symbol and price columns")
+                        price_table = pd.DataFrame(open_holdings).drop_duplicates('symbol', keep='last')
+                        # New Price starts at the live feed price when one is configured
+                        feed_prices = live_prices(set(price_table['symbol']))
+                        price_table = pd.DataFrame({
+                            'Symbol': price_table['symbol'],
+                            'Current Price': price_table['current_price'].astype(float),
+                            'New Price': price_table['symbol'].map(feed_prices).fillna(price_table['current_price']).astype(float)
+                        }).sort_values('Symbol')
+                        edited_prices = st.data_editor(
+                            price_table,
+                            disabled=['Symbol', 'Current Price'],
+                            hide_index=True,
+                            use_container_width=True,
+                            key="mtm_editor"
+                        )
+                        price_file = st.file_uploader("Price file", type=["csv", "parquet"], key="mtm_file")
+                        
+                        changed_prices = edited_prices[edited_prices['New Price'] != edited_prices['Current Price']]
+                        new_prices = dict(zip(changed_prices['Symbol'], changed_prices['New Price'].astype(float)))
+                        if price_file is not None:
+                            try:
+                                new_prices.update(storage.read_prices(price_file, price_file.name))
+                            except ValueError as e:
+                                st.error(f"File harga tidak valid: {e}")
+                        
+                        repriced = storage.reprice_holdings(open_holdings, new_prices)
+                        if repriced:
+                            before = {h['id']: h.get('unrealized_pnl', 0) for h in open_holdings}
+                            pnl_change = sum(h['unrealized_pnl'] - before[h['id']] for h in repriced)
+                            col_mtm1, col_mtm2 = st.columns(2)
+                            with col_mtm1:
+                                st.metric("Positions to Update", len(repriced))
+                            with col_mtm2:
+                                st.metric("Unrealized P&L Change", f"${pnl_change:,.2f}",
+                                         delta_color="normal" if pnl_change >= 0 else "inverse")
+                        
+                        if st.button("⚡ Apply Prices", disabled=not repriced, use_container_width=True, type="primary", key="mtm_apply"):
+                            count = reprice_open_holdings(new_prices)
+                            st.success(f"✅ {count} posisi berhasil diupdate!")
+                            st.rerun()
+                    
                     # Display each holding with update/close options
                     for idx, holding in enumerate(open_holdings):
                         with st.expander(f"📊 {holding['symbol']} - Qty: {holding['quantity']} | Entry: ${holding['entry_price']:.2f}", expanded=False):
@@ -1425,15 +1717,15 @@ def main():
                                     
                                     if submitted_edit:
                                         # Update holding data
-                                        holding['symbol'] = edit_symbol
-                                        holding['quantity'] = edit_quantity
-                                        holding['entry_price'] = edit_entry_price
-                                        holding['entry_date'] = edit_entry_date.strftime('%Y-%m-%d')
-                                        holding['current_price'] = edit_current_price
-                                        holding['notes'] = edit_notes
-                                        holding['unrealized_pnl'] = new_unrealized
-                                        
-                                        save_holdings_data(holdings_data)
+                                        update_holding(holding['id'], lambda current: {
+                                            'symbol': edit_symbol,
+                                            'quantity': edit_quantity,
+                                            'entry_price': edit_entry_price,
+                                            'entry_date': edit_entry_date.strftime('%Y-%m-%d'),
+                                            'current_price': edit_current_price,
+                                            'notes': edit_notes,
+                                            'unrealized_pnl': new_unrealized
+                                        })
                                         st.success("✅ Position updated successfully!")
                                         st.balloons()
                                         st.rerun()
@@ -1457,9 +1749,10 @@ def main():
                                     st.warning(f"💹 New Unrealized P&L will be: **${new_pnl:,.2f}**")
                                 
                                 if st.button("🔄 Update Price", key=f"update_{holding['id']}", use_container_width=True, type="primary"):
-                                    holding['current_price'] = new_price
-                                    holding['unrealized_pnl'] = (holding['quantity'] * new_price) - (holding['quantity'] * holding['entry_price'])
-                                    save_holdings_data(holdings_data)
+                                    update_holding(holding['id'], lambda current: {
+                                        'current_price': new_price,
+                                        'unrealized_pnl': (current['quantity'] * new_price) - (current['quantity'] * current['entry_price'])
+                                    })
                                     st.success("✅ Price updated!")
                                     st.rerun()
                             
@@ -1491,41 +1784,41 @@ def main():
                                              delta_color="normal" if preview_realized_pnl >= 0 else "inverse")
                                 
                                 if st.button("✅ Confirm Close Position", key=f"close_{holding['id']}", type="primary", use_container_width=True):
-                                    # Calculate realized P&L
-                                    realized_pnl = (holding['quantity'] * close_price) - (holding['quantity'] * holding['entry_price'])
-                                    
-                                    # Add to closed trades
-                                    closed_trade = {
-                                        "date": datetime.now().strftime("%Y-%m-%d"),
-                                        "symbol": holding['symbol'],
-                                        "position": "Long",
-                                        "entry_price": holding['entry_price'],
-                                        "exit_price": close_price,
-                                        "volume": holding['quantity'] * close_price,
-                                        "pnl": realized_pnl,
-                                        "notes": f"Closed from holdings. Entry: {holding['entry_date']}. {holding.get('notes', '')}",
-                                        "timestamp": datetime.now().isoformat()
-                                    }
-                                    
-                                    # Update data
-                                    data.append(closed_trade)
-                                    save_data(data)
-                                    
-                                    # Mark as closed
-                                    holding['status'] = 'closed'
-                                    holding['close_price'] = close_price
-                                    holding['close_date'] = datetime.now().strftime("%Y-%m-%d")
-                                    holding['realized_pnl'] = realized_pnl
-                                    save_holdings_data(holdings_data)
+                                    # Mark as closed first; only one session can close an open position
+                                    closed = update_holding(holding['id'], lambda current: {
+                                        'status': 'closed',
+                                        'close_price': close_price,
+                                        'close_date': datetime.now().strftime("%Y-%m-%d"),
+                                        'realized_pnl': (current['quantity'] * close_price) - (current['quantity'] * current['entry_price'])
+                                    } if current.get('status') == 'open' else None)
                                     
-                                    st.success(f"✅ Position closed! Realized P&L: ${realized_pnl:.2f}")
-                                    st.balloons()
-                                    st.rerun()
+                                    if closed is None:
+                                        st.error("❌ Posisi ini sudah ditutup atau dihapus di session lain")
+                                    else:
+                                        realized_pnl = closed['realized_pnl']
+                                        
+                                        # Add to closed trades
+                                        closed_trade = {
+                                            "date": closed['close_date'],
+                                            "symbol": closed['symbol'],
+                                            "position": "Long",
+                                            "entry_price": closed['entry_price'],
+                                            "exit_price": close_price,
+                                            "volume": closed['quantity'] * close_price,
+                                            "pnl": realized_pnl,
+                                            "notes": f"Closed from holdings. Entry: {closed['entry_date']}. {closed.get('notes', '')}",
+                                            "timestamp": datetime.now().isoformat()
+                                        }
+                                        append_data(closed_trade)
+                                        
+                                        st.success(f"✅ Position closed! Realized P&L: ${realized_pnl:.2f}")
+                                        st.balloons()
+                                        st.rerun()
                 else:
                     st.info("📭 Tidak ada posisi terbuka. Tambahkan posisi baru di tab 'Add New Position'")
                 
                 # Show closed positions
-                closed_holdings = [h for h in holdings_data if h.get('status') == 'closed']
+                closed_holdings = load_holdings_data('closed')
                 if closed_holdings:
                     st.divider()
                     st.markdown("### 📜 Closed Positions History")
@@ -1569,7 +1862,7 @@ def main():
             
             col1, col2 = st.columns([3, 1])
             with col1:
-                st.info("💡 **Tip**: Set this to your account balance before you started trading. Portfolio value will be calculated as: Initial Balance + Net P&L")
+                st.info("💡 **Tip**: Set this to your account balance before you started trading. Portfolio value will be calculated as: Initial Balance + Net P&L + Cash Flows")
             
             submitted = st.form_submit_button("💾 Save Balance", use_container_width=True, type="primary")
             
@@ -1581,21 +1874,55 @@ def main():
         
         st.divider()
         
+        # Cash-flow ledger
+        st.markdown("### 💸 Cash Flow Ledger")
+        st.caption("Deposit, withdrawal, fee dan funding di luar trade. Fee dan funding dari futures trade sudah termasuk di P&L trade.")
+        
+        with st.form("ledger_form"):
+            col_ledger1, col_ledger2 = st.columns(2)
+            with col_ledger1:
+                flow_date = st.date_input("Date", datetime.now())
+                flow_type = st.selectbox("Type", list(storage.LEDGER_SIGNS), format_func=str.title)
+            with col_ledger2:
+                flow_amount = st.number_input("Amount (USD)", step=0.01,
+                                              help="Positif; funding: positif = diterima, negatif = dibayar")
+                flow_notes = st.text_input("Notes")
+            
+            submitted_flow = st.form_submit_button("💾 Save Cash Flow", use_container_width=True)
+            
+            if submitted_flow:
+                if flow_type != 'funding' and flow_amount <= 0:
+                    st.error("❌ Amount harus lebih dari 0")
+                else:
+                    append_ledger_entry({
+                        "date": flow_date.strftime("%Y-%m-%d"),
+                        "type": flow_type,
+                        "amount": flow_amount,
+                        "notes": flow_notes,
+                        "timestamp": datetime.now().isoformat()
+                    })
+                    st.success("✅ Cash flow berhasil disimpan!")
+                    st.rerun()
+        
+        if load_count('ledger') > 0:
+            render_paged_table('ledger', "balance_ledger")
+        
+        st.divider()
+        
         # Show portfolio calculation preview
         st.markdown("### 📈 Portfolio Value Preview")
-        stats = calculate_statistics(data, futures_data)
+        stats = load_statistics()
         
         # Calculate unrealized P&L
-        total_unrealized_pnl = 0
-        if holdings_data:
-            for holding in holdings_data:
-                if holding.get('status') == 'open':
-                    total_unrealized_pnl += holding.get('unrealized_pnl', 0)
+        total_unrealized_pnl = analytics.holdings_totals(load_open_holdings())['unrealized_pnl']
         
+        # Running balance with the balance entered above
+        df_portfolio = load_portfolio_history(new_balance)
+        balance = df_portfolio['portfolio_value'].iloc[-1] if len(df_portfolio) > 0 else new_balance
         realized_pnl = stats['net_pnl']
         total_pnl = realized_pnl + total_unrealized_pnl
-        portfolio_value = new_balance + total_pnl
-        change_pct = ((total_pnl / new_balance) * 100) if new_balance > 0 else 0
+        portfolio_value = balance + total_unrealized_pnl
+        twr = load_returns(new_balance, portfolio_value)['twr']
         
         preview_col1, preview_col2, preview_col3, preview_col4 = st.columns(4)
         with preview_col1:
@@ -1608,7 +1935,7 @@ def main():
                      delta_color="normal" if total_unrealized_pnl >= 0 else "inverse")
         with preview_col4:
             st.metric("Portfolio Value", f"${portfolio_value:,.2f}", 
-                     delta=f"{change_pct:+.2f}%",
+                     delta=f"{twr * 100:+.2f}%" if twr is not None else None,
                      delta_color="normal" if total_pnl >= 0 else "inverse")
     
     else:  # Data Management
@@ -1638,11 +1965,65 @@ def main():
         
         st.divider()
         
+        # Bulk Import
+        st.subheader("📤 Bulk Import (CSV / Parquet)")
+        st.caption("Spot: date, symbol, pnl (opsional: position, entry_price, exit_price, volume, notes, timestamp). "
+                   "Futures: date, pnl (opsional: symbol, side, size, leverage, fees, funding, notes, timestamp). "
+                   "Duplikat dicocokkan dengan entry yang sudah tersimpan: satu baris dilewati per entry "
+                   "tersimpan dengan date, symbol, timestamp dan pnl yang sama. Baris yang identik di dalam "
+                   "file yang sama tetap diimport semuanya (misalnya dua fill dengan hasil yang sama).")
+        
+        if 'import_result' in st.session_state:
+            st.success(st.session_state.pop('import_result'))
+        
+        col_imp1, col_imp2 = st.columns([1, 3])
+        with col_imp1:
+            import_target = st.selectbox("Target", ["Spot", "Futures"], key="import_target")
+        with col_imp2:
+            import_file = st.file_uploader("File", type=["csv", "parquet"], key="import_file")
+        
+        if st.button("📥 Import", disabled=import_file is None, key="import_button"):
+            try:
+                with st.spinner("Importing..."):
+                    result = import_trades(import_target.lower(), import_file)
+            except ValueError as e:
+                st.error(f"Import gagal: {e}")
+            else:
+                st.session_state.import_result = (
+                    f"✅ {result['imported']} baris berhasil diimport "
+                    f"({result['duplicates']} duplikat dilewati, {result['rejected']} baris tidak valid)")
+                st.rerun()
+        
+        st.divider()
+        
+        # Cash-flow ledger
+        st.subheader("Cash Flow Ledger")
+        if load_count('ledger') > 0:
+            render_paged_table('ledger', "manage_ledger")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("🗑️ Clear Ledger", type="secondary", key="clear_ledger"):
+                    if st.session_state.get('confirm_delete_ledger', False):
+                        save_ledger_data([])
+                        st.session_state.confirm_delete_ledger = False
+                        st.success("Ledger berhasil dihapus!")
+                        st.rerun()
+                    else:
+                        st.session_state.confirm_delete_ledger = True
+                        st.warning("Klik sekali lagi untuk konfirmasi")
+            
+            with col2:
+                render_download_buttons('ledger', "Ledger", "ledger_data")
+        else:
+            st.info("Belum ada cash flow. Tambahkan di halaman 'Entry Balance'")
+        
+        st.divider()
+        
         # Futures Data Management
         st.subheader("Futures Data")
-        if futures_data:
-            df_futures = pd.DataFrame(futures_data)
-            st.dataframe(df_futures, use_container_width=True, hide_index=True)
+        if load_count('futures') > 0:
+            render_paged_table('futures', "manage_futures")
             
             col1, col2 = st.columns(2)
             with col1:
@@ -1657,13 +2038,7 @@ def main():
                         st.warning("Klik sekali lagi untuk konfirmasi")
             
             with col2:
-                csv_futures = df_futures.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Futures CSV",
-                    data=csv_futures,
-                    file_name=f"futures_data_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
-                )
+                render_download_buttons('futures', "Futures", "futures_data")
         else:
             st.info("Belum ada data futures")
         
@@ -1671,9 +2046,8 @@ def main():
         
         # Spot Data Management
         st.subheader("Spot Data")
-        if data:
-            df = pd.DataFrame(data)
-            st.dataframe(df, use_container_width=True, hide_index=True)
+        if load_count('spot') > 0:
+            render_paged_table('spot', "manage_spot")
             
             col1, col2 = st.columns(2)
             with col1:
@@ -1688,13 +2062,7 @@ def main():
                         st.warning("Klik sekali lagi untuk konfirmasi")
             
             with col2:
-                csv = df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Spot CSV",
-                    data=csv,
-                    file_name=f"spot_data_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
-                )
+                render_download_buttons('spot', "Spot", "spot_data")
         else:
             st.info("Belum ada data spot")
 
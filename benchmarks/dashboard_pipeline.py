@@ -0,0 +1,377 @@
+# Benchmark for the Dashboard data pipeline.
+#
+# Generates synthetic spot, futures, holdings, ledger and price history journals
+# at each size (number of spot trades; futures get a quarter of that) and opens
+# them through storage.create_backend in every storage mode, as the app does
+# (sqlite imports them on first open). After one untimed pass has persisted the
+# rollup, stats and snapshots, it runs the backend queries and computations
+# behind the Dashboard without Streamlit and reports wall time (best of --repeat
+# runs) and tracemalloc peak per stage. Peak memory is measured in a separate
+# pass so tracing does not skew the timings. The stored statistics are also
+# checked against the full recompute (analytics.calculate_statistics); a
+# mismatch makes the run exit with status 1.
+#
+#   python benchmarks/dashboard_pipeline.py --sizes 1000 10000 --output before.json
+#   python benchmarks/dashboard_pipeline.py --sizes 1000 10000 --compare before.json
+#   python benchmarks/dashboard_pipeline.py --sizes 100000 --modes sqlite
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analytics
+import storage
+
+STORE_FILES = {'spot': 'trading_data.json', 'futures': 'futures_data.json',
+               'holdings': 'holdings_data.json', 'ledger': 'ledger_data.json',
+               'balance': 'balance_data.json', 'rollup': 'rollup_data.json',
+               'stats': 'stats_data.json', 'price_history': 'holdings_prices.arrow'}
+SQLITE_FILE = 'trading_journal.db'
+MODES = ['jsonl', 'json', 'sqlite']
+SYMBOLS = ['BTC/USD', 'ETH/USD', 'SOL/USD', 'BNB/USD', 'XRP/USD', 'ADA/USD', 'DOGE/USD', 'AVAX/USD']
+FUTURES_SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'BNBUSDT']
+INITIAL_BALANCE = 10000.0
+START_DATE = pd.Timestamp('2020-01-01')
+
+# Synthetic data: trades spread over roughly 20 per day, at most ten years
+
+def trading_days(size):
+    return int(min(max(size // 20, 30), 3650))
+
+
+def random_dates(rng, size, days):
+    offsets = rng.integers(0, days, size)
+    return (START_DATE + pd.to_timedelta(np.sort(offsets), unit='D')).strftime('%Y-%m-%d')
+
+
+def spot_records(rng, size, days):
+    entry = rng.uniform(1, 50000, size).round(2)
+    exit_price = (entry * rng.normal(1, 0.02, size)).round(2)
+    volume = rng.uniform(10, 5000, size).round(2)
+    position = rng.choice(['Long', 'Short'], size)
+    sign = np.where(position == 'Long', 1, -1)
+    return pd.DataFrame({
+        'date': random_dates(rng, size, days),
+        'symbol': rng.choice(SYMBOLS, size),
+        'position': position,
+        'entry_price': entry,
+        'exit_price': exit_price,
+        'volume': volume,
+        'pnl': (sign * (exit_price - entry) / entry * volume).round(2),
+        'notes': '',
+        'timestamp': '2020-01-01 00:00:00',
+    }).to_dict('records')
+
+
+def futures_records(rng, size, days):
+    fees = rng.uniform(0, 5, size).round(2)
+    funding = rng.normal(0, 1, size).round(2)
+    return pd.DataFrame({
+        'date': random_dates(rng, size, days),
+        'symbol': rng.choice(FUTURES_SYMBOLS, size),
+        'side': rng.choice(['Long', 'Short'], size),
+        'size': rng.uniform(100, 20000, size).round(2),
+        'leverage': rng.choice([1.0, 5.0, 10.0, 20.0], size),
+        'fees': fees,
+        'funding': funding,
+        'pnl': (rng.normal(2, 50, size) - fees + funding).round(2),
+        'notes': '',
+        'timestamp': '2020-01-01 00:00:00',
+    }).to_dict('records')
+
+
+def holdings_records(rng, size, days):
+    entry = rng.uniform(1, 50000, size).round(2)
+    current = (entry * rng.normal(1, 0.1, size)).round(2)
+    quantity = rng.uniform(0.01, 10, size).round(4)
+    closed = rng.random(size) < 0.3
+    entry_dates = random_dates(rng, size, days)
+    records = pd.DataFrame({
+        'id': [f"h{n}" for n in range(size)],
+        'symbol': rng.choice(SYMBOLS, size),
+        'quantity': quantity,
+        'entry_price': entry,
+        'current_price': current,
+        'entry_date': entry_dates,
+        'unrealized_pnl': np.where(closed, 0.0, ((current - entry) * quantity).round(2)),
+        'status': np.where(closed, 'closed', 'open'),
+        'notes': '',
+        'timestamp': '2020-01-01 00:00:00',
+    }).to_dict('records')
+    for record in records:
+        if record['status'] == 'closed':
+            record.update(close_price=record['current_price'], close_date=record['entry_date'],
+                          realized_pnl=(record['current_price'] - record['entry_price']) * record['quantity'])
+    return records
+
+
+def ledger_records(rng, size, days):
+    kinds = rng.choice(['deposit', 'withdrawal', 'fee', 'funding'], size, p=[0.5, 0.2, 0.15, 0.15])
+    return pd.DataFrame({
+        'date': random_dates(rng, size, days),
+        'type': kinds,
+        'amount': np.where(kinds == 'funding', rng.normal(0, 20, size), rng.uniform(10, 2000, size)).round(2),
+        'notes': '',
+        'timestamp': '2020-01-01 00:00:00',
+    }).to_dict('records')
+
+
+def price_history_frame(rng, holdings, size, days):
+    # Snapshots at random dates for random holdings, last one per (id, date) wins
+    ids = np.array([h['id'] for h in holdings])
+    picks = rng.integers(0, len(ids), size)
+    return storage.fold_price_history(pd.DataFrame({
+        'id': ids[picks],
+        'date': pd.to_datetime(random_dates(rng, size, days)),
+        'price': rng.uniform(1, 50000, size).round(2),
+        'unrealized_pnl': rng.normal(0, 200, size).round(2),
+    }))
+
+
+def generate(directory, size, seed):
+    import pyarrow as pa
+    rng = np.random.default_rng(seed)
+    days = trading_days(size)
+    holdings = holdings_records(rng, max(size // 100, 10), days)
+    paths = {store: os.path.join(directory, name) for store, name in STORE_FILES.items()}
+    storage.write_journal(paths['spot'], spot_records(rng, size, days))
+    storage.write_journal(paths['futures'], futures_records(rng, max(size // 4, 1), days))
+    storage.write_journal(paths['holdings'], holdings)
+    storage.write_journal(paths['ledger'], ledger_records(rng, max(size // 1000, 5), days))
+    history = price_history_frame(rng, holdings, max(size // 10, 10), days)
+    storage.write_arrow(paths['price_history'], pa.Table.from_pandas(history, preserve_index=False))
+    storage.atomic_write_json(paths['balance'], {'initial_balance': INITIAL_BALANCE})
+
+
+# Pipeline stages in Dashboard order: the backend queries the app caches per
+# data version, then the computations over their results. Each takes the
+# outputs of the earlier stages (ctx) and returns its own.
+
+def stage_rollup(ctx):
+    return ctx['backend'].rollup('day')
+
+
+def stage_statistics(ctx):
+    return ctx['backend'].statistics()
+
+
+def stage_ledger_frame(ctx):
+    return ctx['backend'].frame('ledger')
+
+
+def stage_cash_flows(ctx):
+    return analytics.daily_cash_flows(ctx['ledger_frame'])
+
+
+def stage_price_history(ctx):
+    return ctx['backend'].price_history()
+
+
+def stage_portfolio_history(ctx):
+    return analytics.build_portfolio_history(ctx['rollup'], INITIAL_BALANCE,
+                                             ctx['price_history'], ctx['cash_flows'])
+
+
+def stage_risk(ctx):
+    return analytics.risk_metrics(ctx['portfolio_history'], INITIAL_BALANCE)
+
+
+def stage_returns(ctx):
+    return analytics.returns_metrics(ctx['portfolio_history'], INITIAL_BALANCE)
+
+
+def last_month(ctx):
+    last = ctx['rollup']['date'].max()
+    return last.year, last.month
+
+
+def stage_calendar(ctx):
+    # The latest month of both markets, as on the Details tab
+    year, month = last_month(ctx)
+    return [analytics.calendar_grid(ctx['backend'].month_daily_pnl(market, year, month), year, month)
+            for market in storage.ROLLUP_MARKETS]
+
+
+def stage_futures_daily(ctx):
+    return analytics.futures_daily_table(ctx['backend'].month_trades('futures', *last_month(ctx)))
+
+
+def stage_symbol_months(ctx):
+    return ctx['backend'].symbol_months()
+
+
+def stage_symbol_analytics(ctx):
+    return analytics.symbol_analytics(ctx['symbol_months'])
+
+
+def stage_table_page(ctx):
+    # First page of the spot table, newest first, with its row count and symbol filter
+    backend = ctx['backend']
+    return (backend.count('spot'), backend.symbols('spot'),
+            backend.page('spot', sort_by='date', descending=True, offset=0, limit=50))
+
+
+def stage_holdings_valuation(ctx):
+    # Open holdings repriced at live prices, then valued
+    open_holdings = ctx['backend'].holdings('open')
+    prices = {symbol: float(price) for symbol, price in zip(SYMBOLS, np.linspace(10, 50000, len(SYMBOLS)))}
+    repriced = {h['id']: h for h in storage.reprice_holdings(open_holdings, prices)}
+    return analytics.holdings_totals([repriced.get(h['id'], h) for h in open_holdings])
+
+
+STAGES = [
+    ('rollup', stage_rollup),
+    ('statistics', stage_statistics),
+    ('ledger_frame', stage_ledger_frame),
+    ('cash_flows', stage_cash_flows),
+    ('price_history', stage_price_history),
+    ('portfolio_history', stage_portfolio_history),
+    ('risk', stage_risk),
+    ('returns', stage_returns),
+    ('calendar', stage_calendar),
+    ('futures_daily', stage_futures_daily),
+    ('symbol_months', stage_symbol_months),
+    ('symbol_analytics', stage_symbol_analytics),
+    ('table_page', stage_table_page),
+    ('holdings_valuation', stage_holdings_valuation),
+]
+
+
+def check_statistics(ctx):
+    # The app reads the incremental StatsAccumulator the backend keeps;
+    # analytics.calculate_statistics is the full recompute over the daily
+    # rollup that it has to agree with
+    expected = analytics.calculate_statistics(ctx['rollup'])
+    actual = ctx['statistics']
+    return [f"stats {name}: {actual[name]} != {value}"
+            for name, value in expected.items() if not np.isclose(value, actual[name])]
+
+
+def run_mode(directory, mode, repeat):
+    paths = {store: os.path.join(directory, name) for store, name in STORE_FILES.items()}
+    start = time.perf_counter()
+    ctx = {'backend': storage.create_backend(mode, paths, os.path.join(directory, SQLITE_FILE))}
+    # Untimed first pass: builds what the app persists on its first render
+    # (JSON rollup, stats and Arrow snapshots)
+    for name, stage in STAGES:
+        ctx[name] = stage(ctx)
+    print(f"  {mode}: opened in {time.perf_counter() - start:.2f}s")
+
+    results = {}
+    for name, stage in STAGES:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ctx[name] = stage(ctx)
+            timings.append(time.perf_counter() - start)
+        results[name] = {'seconds': min(timings)}
+    problems = [f"{mode} {problem}" for problem in check_statistics(ctx)]
+    for problem in problems:
+        print(f"    {problem}")
+
+    # Separate pass under tracemalloc; the outputs of the timed pass stay in
+    # ctx, so each peak is the stage's own allocations on top of them
+    tracemalloc.start()
+    try:
+        for name, stage in STAGES:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            stage(ctx)
+            results[name]['peak_mb'] = (tracemalloc.get_traced_memory()[1] - before) / 2 ** 20
+    finally:
+        tracemalloc.stop()
+    return results, problems
+
+
+def run(size, modes, repeat, seed):
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'source')
+        os.makedirs(source)
+        start = time.perf_counter()
+        generate(source, size, seed)
+        print(f"{size:>9,} trades: generated in {time.perf_counter() - start:.2f}s")
+
+        # Every mode starts from its own copy of the same journals
+        results, problems = {}, []
+        for mode in modes:
+            mode_directory = os.path.join(directory, mode)
+            shutil.copytree(source, mode_directory)
+            results[mode], mode_problems = run_mode(mode_directory, mode, repeat)
+            problems += mode_problems
+        return results, problems
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results, baseline=None):
+    for size, modes in results.items():
+        for mode, stages in modes.items():
+            print(f"\n{int(size):,} trades, {mode}")
+            print(f"  {'stage':20s} {'time (ms)':>12s} {'peak (MB)':>10s}" + (f" {'vs base':>8s}" if baseline else ""))
+            for name, result in stages.items():
+                line = f"  {name:20s} {result['seconds'] * 1000:12.2f} {result['peak_mb']:10.2f}"
+                before = (baseline or {}).get(size, {}).get(mode, {}).get(name)
+                if before and before['seconds'] > 0:
+                    line += f" {result['seconds'] / before['seconds']:7.2f}x"
+                print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the Dashboard computations on synthetic journals")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000],
+                        help="spot trades per run (futures get a quarter of that)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage, the best one counts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="results JSON of an earlier run to compare against")
+    args = parser.parse_args()
+
+    results, problems = {}, []
+    for size in args.sizes:
+        results[str(size)], size_problems = run(size, args.modes, args.repeat, args.seed)
+        problems += size_problems
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    report(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'commit': git_commit(),
+                'created': pd.Timestamp.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'numpy': np.__version__,
+                'modes': args.modes,
+                'repeat': args.repeat,
+                'seed': args.seed,
+                'results': results,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# Stress test for concurrent journal writes.
+#
+# Many workers append spot/futures entries, bump a counter on shared holdings
+# through backend.update() and race to close the same positions. Afterwards
+# every entry must be present, the counters must add up (no lost updates),
+# each holding must be closed exactly once, and the rollups and statistics
+# must match a rebuild from the stored entries.
+#
+#   python benchmarks/stress_writes.py --workers 16 --writes 100
+#   python benchmarks/stress_writes.py --kind process --modes sqlite
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+
+STORE_FILES = {'spot': 'trading_data.json', 'futures': 'futures_data.json',
+               'holdings': 'holdings_data.json', 'balance': 'balance_data.json',
+               'rollup': 'rollup_data.json', 'stats': 'stats_data.json',
+               'price_history': 'holdings_prices.arrow', 'ledger': 'ledger_data.json'}
+SYMBOLS = ['BTC/USD', 'ETH/USD', 'SOL/USD']
+HOLDINGS = 4
+
+
+def store_paths(directory):
+    return ({store: os.path.join(directory, name) for store, name in STORE_FILES.items()},
+            os.path.join(directory, 'trading_journal.db'))
+
+
+def worker(backend, worker_id, writes):
+    closes = 0
+    for i in range(writes):
+        day = f"2025-{1 + i % 12:02d}-{1 + worker_id % 28:02d}"
+        backend.append('spot', [{
+            'date': day, 'symbol': SYMBOLS[i % len(SYMBOLS)], 'position': 'Long',
+            'entry_price': 1.0, 'exit_price': 1.0, 'volume': 10.0,
+            'pnl': float((i % 7) - 3), 'notes': '', 'timestamp': f"{worker_id}-{i}"
+        }])
+        backend.append('futures', [{
+            'date': day, 'pnl': float((i % 5) - 2), 'notes': '', 'timestamp': f"{worker_id}-{i}"
+        }])
+        backend.update('holdings', f"h{i % HOLDINGS}", lambda h: {'quantity': h['quantity'] + 1})
+    for n in range(HOLDINGS):
+        closed = backend.update('holdings', f"h{n}",
+                                lambda h: {'status': 'closed'} if h['status'] == 'open' else None)
+        closes += closed is not None
+    return closes
+
+
+def process_worker(mode, directory, worker_id, writes):
+    paths, sqlite_path = store_paths(directory)
+    return worker(storage.create_backend(mode, paths, sqlite_path), worker_id, writes)
+
+
+def check(backend, workers, writes):
+    problems = []
+    spot, futures = backend.load('spot'), backend.load('futures')
+    if len(spot) != workers * writes or len(futures) != workers * writes:
+        problems.append(f"entries: spot={len(spot)} futures={len(futures)}, expected {workers * writes} each")
+
+    bumps = [sum(1 for i in range(writes) if i % HOLDINGS == n) * workers for n in range(HOLDINGS)]
+    for holding in backend.load('holdings'):
+        n = int(holding['id'][1:])
+        if holding['quantity'] != bumps[n]:
+            problems.append(f"{holding['id']}: quantity {holding['quantity']}, expected {bumps[n]} (lost update)")
+        if holding['status'] != 'closed':
+            problems.append(f"{holding['id']}: still {holding['status']}")
+
+    rows = storage.fold_rollup(storage.rollup_rows('spot', spot) + storage.rollup_rows('futures', futures))
+    for period in ['day', 'month']:
+        expected, actual = (frame.astype({'market': str, 'symbol': str})
+                            .sort_values(['date', 'market', 'symbol']).reset_index(drop=True)
+                            for frame in (storage.rollup_frame(rows, period), backend.rollup(period)))
+        if len(expected) != len(actual) or not (
+                np.allclose(expected['pnl'], actual['pnl']) and np.allclose(expected['volume'], actual['volume'])
+                and (expected['trades'].to_numpy() == actual['trades'].to_numpy()).all()):
+            problems.append(f"{period} rollup differs from a rebuild")
+
+    expected_stats = storage.StatsAccumulator.from_rollup(rows).stats()
+    actual_stats = backend.statistics()
+    for name, value in expected_stats.items():
+        if not np.isclose(value, actual_stats[name]):
+            problems.append(f"stats {name}: {actual_stats[name]} != {value}")
+    return problems
+
+
+def run(mode, kind, workers, writes):
+    with tempfile.TemporaryDirectory() as directory:
+        paths, sqlite_path = store_paths(directory)
+        backend = storage.create_backend(mode, paths, sqlite_path)
+        backend.save('holdings', [{'id': f"h{n}", 'symbol': 'BTC', 'quantity': 0, 'entry_price': 1.0,
+                                   'current_price': 1.0, 'unrealized_pnl': 0.0, 'status': 'open'}
+                                  for n in range(HOLDINGS)])
+        start = time.perf_counter()
+        if kind == 'thread':
+            # Threads share one backend, like Streamlit sessions in one process
+            with ThreadPoolExecutor(workers) as pool:
+                closes = sum(pool.map(lambda w: worker(backend, w, writes), range(workers)))
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                closes = sum(pool.map(process_worker, [mode] * workers, [directory] * workers,
+                                      range(workers), [writes] * workers))
+        elapsed = time.perf_counter() - start
+
+        problems = check(backend, workers, writes)
+        if closes != HOLDINGS:
+            problems.append(f"{closes} successful closes for {HOLDINGS} holdings")
+        operations = workers * (writes * 3 + HOLDINGS)
+        status = "OK" if not problems else "FAIL"
+        print(f"{mode:6s} {kind:7s} {workers:3d} workers x {writes} writes: "
+              f"{elapsed:6.2f}s ({operations / elapsed:,.0f} ops/s) {status}")
+        for problem in problems:
+            print(f"    {problem}")
+        return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hammer the storage backends with concurrent writers")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=100, help="entries per worker and store")
+    parser.add_argument("--kind", choices=["thread", "process"], default="thread")
+    parser.add_argument("--modes", nargs="+", default=["jsonl", "json", "sqlite"])
+    args = parser.parse_args()
+    ok = all([run(mode, args.kind, args.workers, args.writes) for mode in args.modes])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# Price feeds for open holdings.
+#
+# A provider answers fetch(symbols) -> {symbol: price} for all requested symbols
+# in one batched call. PriceFeed keeps the last price per symbol and refreshes
+# the ones older than its TTL on a background thread, so readers (Streamlit
+# reruns) only ever read the cache and never wait on the provider's I/O.
+
+import threading
+import time
+
+import pandas as pd
+
+import storage
+
+
+def _naive_utc(timestamp):
+    return timestamp.tz_convert('UTC').tz_localize(None) if timestamp.tzinfo is not None else timestamp
+
+
+class ReplayPriceProvider:
+    # Replays a local CSV/Parquet price file with symbol, price and optionally
+    # timestamp columns. With timestamps the price of a symbol is its last row
+    # at or before the replay clock: the wall clock, or `start` advancing at
+    # `speed` x real time from when the provider was created. Times are naive
+    # UTC, like the timestamps read_price_frame returns. The file is re-read
+    # when it changes on disk.
+    def __init__(self, path, start=None, speed=1.0):
+        self.path = path
+        self.start = _naive_utc(pd.Timestamp(start)) if start is not None else None
+        self.speed = float(speed)
+        self.created = time.time()
+        self._signature = None
+        self._frame = None
+
+    def now(self):
+        if self.start is None:
+            return _naive_utc(pd.Timestamp.now(tz='UTC'))
+        return self.start + pd.Timedelta(seconds=(time.time() - self.created) * self.speed)
+
+    def _load(self):
+        signature = storage.file_signature(self.path)
+        if signature is None:
+            return None
+        if signature != self._signature:
+            with open(self.path, 'rb') as f:
+                frame = storage.read_price_frame(f, self.path)
+            frame['key'] = frame['symbol'].map(storage.price_key)
+            if 'timestamp' in frame.columns:
+                frame = frame[frame['timestamp'].notna()].sort_values('timestamp', kind='stable')
+            self._frame, self._signature = frame, signature
+        return self._frame
+
+    def fetch(self, symbols):
+        frame = self._load()
+        if frame is None:
+            return {}
+        keys = {storage.price_key(symbol): symbol for symbol in symbols}
+        frame = frame[frame['key'].isin(keys.keys())]
+        if 'timestamp' in frame.columns:
+            frame = frame[frame['timestamp'] <= self.now()]
+        latest = frame.groupby('key', sort=False)['price'].last()
+        return {keys[key]: float(price) for key, price in latest.items()}
+
+
+PROVIDERS = {'replay': ReplayPriceProvider}
+
+
+def create_provider(name, **options):
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown price provider: {name}")
+    return PROVIDERS[name](**options)
+
+
+class PriceFeed:
+    def __init__(self, provider, ttl=60.0):
+        self.provider = provider
+        self.ttl = float(ttl)
+        self.error = None
+        self.updated_at = None
+        self._prices = {}
+        self._checked = {}
+        self._wanted = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='price-feed', daemon=True)
+        self._thread.start()
+
+    def _stale(self, now):
+        return [symbol for symbol in self._wanted
+                if now - self._checked.get(symbol, float('-inf')) >= self.ttl]
+
+    def prices(self, symbols):
+        # Cached prices for the symbols we have; stale or new symbols are
+        # fetched in the background and show up on a later call
+        symbols = set(symbols)
+        with self._lock:
+            self._wanted |= symbols
+            cached = {symbol: self._prices[symbol] for symbol in symbols if symbol in self._prices}
+            stale = bool(self._stale(time.monotonic()))
+        if stale:
+            self._wake.set()
+        return cached
+
+    def refresh(self):
+        with self._lock:
+            self._checked.clear()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.ttl)
+            self._wake.clear()
+            with self._lock:
+                stale = self._stale(time.monotonic())
+            if not stale:
+                continue
+            try:
+                fetched = self.provider.fetch(stale)
+            except Exception as e:
+                self.error = str(e)
+                fetched = {}
+            else:
+                self.error = None
+            now = time.monotonic()
+            with self._lock:
+                self._prices.update(fetched)
+                self._checked.update(dict.fromkeys(stale, now))
+            self.updated_at = time.time()
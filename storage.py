@@ -0,0 +1,1345 @@
+import collections
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: writers are only serialized within this process
+    fcntl = None
+
+# Kolom dan tipe data untuk setiap store
+SPOT_SCHEMA = {
+    'date': 'datetime', 'symbol': 'str', 'position': 'str',
+    'entry_price': 'float', 'exit_price': 'float', 'volume': 'float',
+    'pnl': 'float', 'notes': 'str', 'timestamp': 'str'
+}
+# Futures are recorded per trade; pnl is net of fees and funding. Older daily
+# entries only have date, pnl and notes.
+FUTURES_SCHEMA = {
+    'date': 'datetime', 'symbol': 'str', 'side': 'str', 'size': 'float',
+    'leverage': 'float', 'fees': 'float', 'funding': 'float',
+    'pnl': 'float', 'notes': 'str', 'timestamp': 'str'
+}
+HOLDINGS_SCHEMA = {
+    'id': 'str', 'symbol': 'str', 'quantity': 'float', 'entry_price': 'float',
+    'current_price': 'float', 'entry_date': 'datetime', 'unrealized_pnl': 'float',
+    'status': 'str', 'notes': 'str', 'timestamp': 'str', 'close_price': 'float',
+    'close_date': 'datetime', 'realized_pnl': 'float'
+}
+# Cash-flow ledger: deposits, withdrawals, fees and funding outside of trades.
+# Amounts are entered positive, except funding (+ received / - paid).
+LEDGER_SCHEMA = {
+    'date': 'datetime', 'type': 'str', 'amount': 'float', 'notes': 'str', 'timestamp': 'str'
+}
+LEDGER_SIGNS = {'deposit': 1.0, 'withdrawal': -1.0, 'fee': -1.0, 'funding': 1.0}
+# Deposits and withdrawals move capital; fees and funding are results
+CAPITAL_FLOWS = ('deposit', 'withdrawal')
+SCHEMAS = {'spot': SPOT_SCHEMA, 'futures': FUTURES_SCHEMA, 'holdings': HOLDINGS_SCHEMA,
+           'ledger': LEDGER_SCHEMA}
+
+# Holdings are updated in place, so their records are keyed by id
+STORE_KEYS = {'holdings': 'id'}
+
+# Holding price history: one row per (holding id, date), written whenever a
+# holding is. A closed holding gets a zero row on its close date, so its
+# unrealized PnL drops out of the equity from then on.
+PRICE_HISTORY_SCHEMA = {'id': 'str', 'date': 'datetime', 'price': 'float', 'unrealized_pnl': 'float'}
+PRICE_HISTORY_KEY = ['id', 'date']
+
+
+def typed_frame(records, schema):
+    df = pd.DataFrame(records)
+    for column, kind in schema.items():
+        if column not in df.columns:
+            df[column] = None
+        if kind == 'datetime':
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+        elif kind == 'float':
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    return df
+
+
+def holding_snapshots(records, today=None):
+    today = today or pd.Timestamp.today().strftime('%Y-%m-%d')
+    rows = []
+    for record in records:
+        if record.get('status') == 'closed':
+            rows.append({'id': record['id'], 'date': record.get('close_date') or today,
+                         'price': _number(record.get('close_price')), 'unrealized_pnl': 0.0})
+        else:
+            rows.append({'id': record['id'], 'date': today,
+                         'price': _number(record.get('current_price')),
+                         'unrealized_pnl': _number(record.get('unrealized_pnl'))})
+    return rows
+
+
+def fold_price_history(*parts):
+    # Later rows win for the same (id, date)
+    frames = [typed_frame(part, PRICE_HISTORY_SCHEMA) if isinstance(part, list) else part for part in parts]
+    frames = [frame[list(PRICE_HISTORY_SCHEMA)] for frame in frames if len(frame)]
+    if not frames:
+        return typed_frame([], PRICE_HISTORY_SCHEMA)[list(PRICE_HISTORY_SCHEMA)]
+    df = pd.concat(frames, ignore_index=True).drop_duplicates(PRICE_HISTORY_KEY, keep='last')
+    return df.sort_values(['date', 'id'], kind='stable').reset_index(drop=True)
+
+
+# [start, end) of a month as ISO date strings, for range queries on 'date'
+def month_bounds(year, month):
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year:04d}-{month:02d}-01", f"{next_year:04d}-{next_month:02d}-01"
+
+
+# Paged tables filter on this column's date range (end inclusive)
+PAGE_DATE_COLUMNS = {'spot': 'date', 'futures': 'date', 'holdings': 'entry_date', 'ledger': 'date'}
+
+
+def page_bounds(start, end):
+    # Inclusive ISO end date -> exclusive bound, so timestamps on the end day still match
+    if end is not None:
+        end = (pd.Timestamp(end) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    return start, end
+
+
+def check_sort(store, sort_by):
+    if sort_by not in SCHEMAS[store]:
+        raise ValueError(f"Unknown sort column for {store}: {sort_by}")
+
+
+# Rollups: PnL, volume and trade count per (period, market, symbol, bucket),
+# where period is 'day' (bucket YYYY-MM-DD) or 'month' (bucket YYYY-MM)
+ROLLUP_MARKETS = ('spot', 'futures')
+ROLLUP_KEY = ('period', 'market', 'symbol', 'bucket')
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def rollup_symbol(market, record):
+    symbol = record.get('symbol')
+    if symbol is None or (market == 'futures' and symbol == ''):
+        # Daily futures entries (no symbol) are grouped under 'Futures'
+        return 'Futures' if market == 'futures' else ''
+    return str(symbol)
+
+
+def rollup_rows(market, records):
+    totals = {}
+    for record in records:
+        day = str(record.get('date', ''))[:10]
+        symbol = rollup_symbol(market, record)
+        # Futures trades count their position size as volume
+        pnl, volume = _number(record.get('pnl')), _number(record.get('volume', record.get('size')))
+        for period, bucket in (('day', day), ('month', day[:7])):
+            total = totals.setdefault((period, market, symbol, bucket), [0.0, 0.0, 0])
+            total[0] += pnl
+            total[1] += volume
+            total[2] += 1
+    return [dict(zip(ROLLUP_KEY, key), pnl=pnl, volume=volume, trades=trades)
+            for key, (pnl, volume, trades) in totals.items()]
+
+
+def fold_rollup(rows):
+    # Sum rows (or deltas) that share the same key
+    totals = {}
+    for row in rows:
+        key = tuple(row[k] for k in ROLLUP_KEY)
+        total = totals.setdefault(key, [0.0, 0.0, 0])
+        total[0] += row['pnl']
+        total[1] += row['volume']
+        total[2] += row['trades']
+    return [dict(zip(ROLLUP_KEY, key), pnl=pnl, volume=volume, trades=trades)
+            for key, (pnl, volume, trades) in totals.items()]
+
+
+def rollup_frame(rows, period):
+    df = pd.DataFrame(rows, columns=list(ROLLUP_KEY) + ['pnl', 'volume', 'trades'])
+    df = df[df['period'] == period].drop(columns='period')
+    df = df.rename(columns={'bucket': 'date'})
+    df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d' if period == 'day' else '%Y-%m', errors='coerce')
+    df['market'] = pd.Categorical(df['market'], categories=ROLLUP_MARKETS)
+    df['symbol'] = df['symbol'].astype('category')
+    df['pnl'] = df['pnl'].astype('float64')
+    df['volume'] = df['volume'].astype('float64')
+    df['trades'] = df['trades'].astype('int64')
+    return df.sort_values('date', kind='stable').reset_index(drop=True)
+
+
+def rollup_daily_by_day(rows):
+    df = pd.DataFrame(rows, columns=list(ROLLUP_KEY) + ['pnl', 'volume', 'trades'])
+    day = df['bucket'].str[8:10].astype('int64').rename('day')
+    return df.groupby(day)['pnl'].sum()
+
+
+# Per (market, symbol, month) trade totals behind Symbol Analysis. Wins and the
+# best/worst trade need the trades themselves, so this groups the store (SQL
+# GROUP BY on the sqlite backend) instead of reading the rollup.
+SYMBOL_MONTH_COLUMNS = ['market', 'symbol', 'month', 'total_pnl', 'trades', 'wins',
+                        'volume', 'best_trade', 'worst_trade']
+
+
+def symbol_months(market, df):
+    if market == 'futures':
+        # Futures trades count their size as volume; daily entries have no symbol
+        symbol = df['symbol'].where(df['symbol'].notna() & (df['symbol'] != ''), 'Futures')
+        volume = df['size']
+    else:
+        symbol, volume = df['symbol'], df['volume']
+    grouped = pd.DataFrame({
+        'symbol': symbol,
+        'month': df['date'].dt.strftime('%Y-%m'),
+        'pnl': df['pnl'],
+        'win': df['pnl'] > 0,
+        'volume': volume
+    }).groupby(['symbol', 'month']).agg(
+        total_pnl=('pnl', 'sum'),
+        trades=('pnl', 'size'),
+        wins=('win', 'sum'),
+        volume=('volume', 'sum'),
+        best_trade=('pnl', 'max'),
+        worst_trade=('pnl', 'min')
+    ).reset_index()
+    return grouped.assign(market=market)[SYMBOL_MONTH_COLUMNS]
+
+
+# Running statistics over daily PnL (all markets). Each new entry only touches
+# its own day: the day's old total is taken out of the counters and the new
+# total put back in, so updates are O(1) regardless of journal size.
+STATS_COUNTERS = ('profit_sum', 'loss_sum', 'winning_days', 'losing_days', 'breakeven_days', 'volume')
+
+
+class StatsAccumulator:
+
+    def __init__(self, daily=None, counters=None):
+        self.daily = dict(daily or {})
+        self.counters = dict.fromkeys(STATS_COUNTERS, 0)
+        self.counters.update(counters or {})
+
+    @staticmethod
+    def day_delta(old, new):
+        # Counter changes when a day's total moves from old (None: no entries yet) to new
+        delta = dict.fromkeys(STATS_COUNTERS, 0)
+        for value, sign in ((old, -1), (new, 1)):
+            if value is None:
+                continue
+            if value > 0:
+                delta['profit_sum'] += sign * value
+                delta['winning_days'] += sign
+            elif value < 0:
+                delta['loss_sum'] += sign * value
+                delta['losing_days'] += sign
+            else:
+                delta['breakeven_days'] += sign
+        return delta
+
+    def add(self, date, pnl, volume=0.0):
+        old = self.daily.get(date)
+        new = (old or 0.0) + pnl
+        self.daily[date] = new
+        for name, value in self.day_delta(old, new).items():
+            self.counters[name] += value
+        self.counters['volume'] += volume
+
+    @classmethod
+    def from_rollup(cls, rows):
+        acc = cls()
+        for row in rows:
+            if row['period'] == 'day':
+                acc.add(row['bucket'], row['pnl'], row['volume'])
+        return acc
+
+    def to_dict(self):
+        return {'daily': self.daily, 'counters': self.counters}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('daily'), data.get('counters'))
+
+    def stats(self):
+        c = self.counters
+        total_profit = c['profit_sum']
+        total_loss = abs(c['loss_sum'])
+        total_days = c['winning_days'] + c['losing_days'] + c['breakeven_days']
+        avg_profit = total_profit / c['winning_days'] if c['winning_days'] > 0 else 0
+        avg_loss = total_loss / c['losing_days'] if c['losing_days'] > 0 else 0
+        return {
+            "total_profit": total_profit,
+            "total_loss": total_loss,
+            "net_pnl": total_profit - total_loss,
+            "trading_volume": c['volume'],
+            "win_rate": (c['winning_days'] / total_days * 100) if total_days > 0 else 0,
+            "winning_days": int(c['winning_days']),
+            "losing_days": int(c['losing_days']),
+            "breakeven_days": int(c['breakeven_days']),
+            "avg_profit": avg_profit,
+            "avg_loss": avg_loss,
+            "profit_loss_ratio": (avg_profit / avg_loss) if avg_loss > 0 else 0
+        }
+
+
+def day_totals(rollup_deltas):
+    # (date, pnl, volume) per day across markets and symbols
+    totals = {}
+    for row in rollup_deltas:
+        if row['period'] == 'day':
+            total = totals.setdefault(row['bucket'], [0.0, 0.0])
+            total[0] += row['pnl']
+            total[1] += row['volume']
+    return [(date, pnl, volume) for date, (pnl, volume) in totals.items()]
+
+
+# Append-only journal: snapshot JSON list (e.g. trading_data.json) plus a
+# JSON Lines log next to it (trading_data.jsonl). New entries only append one
+# line to the log; compaction folds the log back into the snapshot.
+
+# Compact once the log grows past this many bytes
+COMPACT_BYTES = 256 * 1024
+
+
+def log_path(path):
+    return os.path.splitext(path)[0] + ".jsonl"
+
+
+def pending_path(path):
+    return os.path.splitext(path)[0] + ".pending.json"
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    # Atomic rewrites get a new inode, so same-size rewrites within the mtime
+    # granularity still change the signature
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def journal_signature(path):
+    return (file_signature(path), file_signature(log_path(path)))
+
+
+def atomic_write_json(path, obj):
+    # Write to a temp file in the same directory, then rename over the target,
+    # so readers only ever see the old or the new file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(obj, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def read_jsonl(path):
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A crash mid-append can leave one torn line; skip it
+                continue
+    return records
+
+
+def append_jsonl(path, records):
+    lines = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+    with open(path, "ab+") as f:
+        # Start on a fresh line if the previous append was torn
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                lines = "\n" + lines
+        f.write(lines.encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def apply_log(records, log_records, key=None):
+    # Keyed journals (holdings) treat a log record with a known key as an update
+    if key is None:
+        return records + log_records
+    merged = list(records)
+    positions = {record.get(key): idx for idx, record in enumerate(merged)}
+    for record in log_records:
+        idx = positions.get(record.get(key))
+        if idx is None:
+            positions[record.get(key)] = len(merged)
+            merged.append(record)
+        else:
+            merged[idx] = record
+    return merged
+
+
+def read_journal(path, key=None):
+    recover_journal(path)
+    records = read_json(path, [])
+    log_records = read_jsonl(log_path(path))
+    if not log_records:
+        return records
+    return apply_log(records, log_records, key)
+
+
+# Writing a snapshot that replaces the log: the new snapshot goes to a pending
+# file, removing the log commits it, and only then does it replace the snapshot.
+# A crash can leave the pending file behind; recover_journal() drops it while
+# the log still exists (not committed) and installs it once the log is gone,
+# so the log is never replayed on top of a snapshot that already holds it.
+def write_journal(path, records):
+    recover_journal(path)
+    if not os.path.exists(log_path(path)):
+        atomic_write_json(path, records)
+        return
+    atomic_write_json(pending_path(path), records)
+    os.remove(log_path(path))
+    os.replace(pending_path(path), path)
+
+
+def recover_journal(path):
+    pending = pending_path(path)
+    if not os.path.exists(pending):
+        return
+    try:
+        if os.path.exists(log_path(path)):
+            os.remove(pending)
+        else:
+            os.replace(pending, path)
+    except FileNotFoundError:
+        # Another reader finished the recovery first
+        pass
+
+
+def compact_journal(path, key=None):
+    write_journal(path, read_journal(path, key))
+
+
+def append_log(path, records):
+    # Recover first: an append must not make an interrupted write look uncommitted
+    recover_journal(path)
+    append_jsonl(log_path(path), records)
+
+
+def append_journal(path, records, key=None):
+    append_log(path, records)
+    if os.path.getsize(log_path(path)) >= COMPACT_BYTES:
+        compact_journal(path, key)
+
+
+# Typed Arrow IPC snapshots of a store, stamped with the signature they were
+# built from. frame() memory-maps them instead of re-parsing the source while the
+# signature still matches, so a new process starts from the binary columns and
+# numeric columns without nulls come back as zero-copy views of the mapped file.
+SNAPSHOT_SIGNATURE_KEY = b'journal_signature'
+
+
+def read_snapshot(path, signature):
+    if not os.path.exists(path):
+        return None
+    import pyarrow as pa
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+        metadata = reader.schema.metadata or {}
+        if metadata.get(SNAPSHOT_SIGNATURE_KEY) != json.dumps(signature).encode():
+            return None
+        return reader.read_all().to_pandas(split_blocks=True)
+    except Exception:
+        # A damaged snapshot is rebuilt from the source
+        return None
+
+
+def write_snapshot(path, df, signature):
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[SNAPSHOT_SIGNATURE_KEY] = json.dumps(signature).encode()
+    write_arrow(path, table.replace_schema_metadata(metadata))
+
+
+def read_arrow(path):
+    import pyarrow as pa
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all().to_pandas(split_blocks=True)
+
+
+def write_arrow(path, table):
+    import pyarrow as pa
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".arrow", dir=directory)
+    os.close(fd)
+    try:
+        # Uncompressed, so the mapped buffers can be used as they are
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def snapshot_frame(path, signature, build):
+    df = read_snapshot(path, signature)
+    if df is None:
+        df = build()
+        try:
+            write_snapshot(path, df, signature)
+        except Exception:
+            # The snapshot is only a cache; the frame is still returned
+            pass
+    return df
+
+
+class JournalLock:
+    # Writers hold the lock exclusively and readers shared. flock() belongs to an
+    # open file, so separate opens exclude each other across threads as well as
+    # processes. Nested use in a thread that already holds it (a write that reads
+    # or rebuilds) does not lock again.
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._fallback = threading.RLock()
+
+    @contextlib.contextmanager
+    def hold(self, exclusive=True):
+        if getattr(self._local, 'depth', 0):
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+        with contextlib.ExitStack() as stack:
+            if fcntl is None:
+                stack.enter_context(self._fallback)
+            else:
+                f = stack.enter_context(open(self.path, 'a'))
+                fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._local.depth = 1
+            try:
+                yield
+            finally:
+                self._local.depth = 0
+
+
+# Storage backends. Both expose the same API; the app picks one from config.
+
+class JsonBackend:
+    # One JSON file per store; with append_only, new entries go to the .jsonl log
+
+    def __init__(self, paths, append_only=True):
+        self.paths = dict(paths)
+        self.append_only = append_only
+        # One lock for all stores: a write touches the store, rollup and stats together
+        directory = os.path.dirname(os.path.abspath(self.paths['spot']))
+        self.lock = JournalLock(os.path.join(directory, '.journal.lock'))
+
+    def signature(self, store):
+        path = self.paths[store]
+        if store == 'balance':
+            return (path, file_signature(path))
+        return (path,) + journal_signature(path)
+
+    def load(self, store):
+        with self.lock.hold(exclusive=False):
+            return read_journal(self.paths[store], STORE_KEYS.get(store))
+
+    def save(self, store, records):
+        with self.lock.hold():
+            write_journal(self.paths[store], records)
+            if store in ROLLUP_MARKETS:
+                self.rebuild_derived()
+            if store == 'holdings':
+                ids = {record.get('id') for record in records}
+                history = self.price_history()
+                self._write_price_history(fold_price_history(history[history['id'].isin(ids)],
+                                                             holding_snapshots(records)))
+
+    def append(self, store, records):
+        path, key = self.paths[store], STORE_KEYS.get(store)
+        with self.lock.hold():
+            # Deltas only apply to a rollup and stats that match the journals so far
+            derived_current = store in ROLLUP_MARKETS and self._derived_current()
+            if self.append_only:
+                append_journal(path, records, key)
+            else:
+                write_journal(path, apply_log(read_journal(path, key), records, key))
+            if store in ROLLUP_MARKETS:
+                if derived_current:
+                    deltas = rollup_rows(store, records)
+                    self._append_rollup(deltas)
+                    self._append_stats(day_totals(deltas))
+                    self._stamp_derived()
+                else:
+                    self.rebuild_derived()
+            if store == 'holdings':
+                self._append_price_history(holding_snapshots(records))
+
+    def update(self, store, key_value, changes):
+        # Read-modify-write of one keyed record under the lock. changes(current)
+        # returns the fields to set, or None to leave the record as it is.
+        key = STORE_KEYS[store]
+        with self.lock.hold():
+            current = next((r for r in self.load(store) if r.get(key) == key_value), None)
+            if current is None:
+                return None
+            fields = changes(current)
+            if fields is None:
+                return None
+            record = {**current, **fields}
+            self.append(store, [record])
+            return record
+
+    def update_batch(self, store, changes):
+        # Like update() for many records in one write: changes(current records)
+        # returns the updated records
+        with self.lock.hold():
+            records = changes(self.load(store))
+            if records:
+                self.append(store, records)
+            return records
+
+    # The rollup and stats are derived from the spot and futures journals but live
+    # in files of their own, so a crash between a journal append and their deltas
+    # would leave them behind for good. The sources file records the journal
+    # signatures they were last brought up to date with; on a mismatch both are
+    # rebuilt from the journals before they are read or appended to.
+
+    def _sources_path(self):
+        return os.path.splitext(self.paths['rollup'])[0] + '.sources.json'
+
+    def _source_signatures(self):
+        # As JSON stores them (tuples become lists)
+        return json.loads(json.dumps([self.signature(market) for market in ROLLUP_MARKETS]))
+
+    def _derived_current(self):
+        rollup, stats = self.paths['rollup'], self.paths['stats']
+        return ((os.path.exists(rollup) or os.path.exists(log_path(rollup)))
+                and os.path.exists(stats)
+                and read_json(self._sources_path(), None) == self._source_signatures())
+
+    def _stamp_derived(self):
+        atomic_write_json(self._sources_path(), self._source_signatures())
+
+    def rebuild_derived(self):
+        self.rebuild_rollup()
+        self.rebuild_stats()
+        self._stamp_derived()
+
+    def _ensure_derived(self):
+        if not self._derived_current():
+            with self.lock.hold():
+                if not self._derived_current():
+                    self.rebuild_derived()
+
+    # Rollups live in their own journal; the log holds deltas that are
+    # summed on read and folded into the snapshot on compaction
+
+    def _append_rollup(self, deltas):
+        path = self.paths['rollup']
+        if self.append_only:
+            append_log(path, deltas)
+            if os.path.getsize(log_path(path)) >= COMPACT_BYTES:
+                write_journal(path, fold_rollup(read_journal(path)))
+        else:
+            write_journal(path, fold_rollup(read_journal(path) + deltas))
+
+    def rebuild_rollup(self):
+        rows = []
+        for market in ROLLUP_MARKETS:
+            rows += rollup_rows(market, self.load(market))
+        write_journal(self.paths['rollup'], rows)
+
+    def load_rollup(self):
+        self._ensure_derived()
+        with self.lock.hold(exclusive=False):
+            return fold_rollup(read_journal(self.paths['rollup']))
+
+    # Statistics accumulator: snapshot of per-day totals and counters, plus a
+    # log of (date, pnl, volume) lines replayed on read
+
+    def _append_stats(self, totals):
+        path = self.paths['stats']
+        lines = [{'date': date, 'pnl': pnl, 'volume': volume} for date, pnl, volume in totals]
+        if self.append_only:
+            append_log(path, lines)
+            if os.path.getsize(log_path(path)) >= COMPACT_BYTES:
+                write_journal(path, self._read_stats().to_dict())
+        else:
+            acc = self._read_stats()
+            for line in lines:
+                acc.add(line['date'], line['pnl'], line['volume'])
+            write_journal(path, acc.to_dict())
+
+    def rebuild_stats(self):
+        rows = fold_rollup(read_journal(self.paths['rollup']))
+        write_journal(self.paths['stats'], StatsAccumulator.from_rollup(rows).to_dict())
+
+    def _read_stats(self):
+        path = self.paths['stats']
+        recover_journal(path)
+        acc = StatsAccumulator.from_dict(read_json(path, {}))
+        for line in read_jsonl(log_path(path)):
+            acc.add(line['date'], line['pnl'], line['volume'])
+        return acc
+
+    def load_stats(self):
+        self._ensure_derived()
+        with self.lock.hold(exclusive=False):
+            return self._read_stats()
+
+    def statistics(self):
+        return self.load_stats().stats()
+
+    # Holding price history: Arrow IPC file of the columns plus a log of new
+    # rows, folded into the file on compaction
+
+    def _append_price_history(self, rows):
+        path = self.paths['price_history']
+        if self.append_only:
+            append_jsonl(log_path(path), rows)
+            if os.path.getsize(log_path(path)) >= COMPACT_BYTES:
+                self._write_price_history(self.price_history())
+        else:
+            self._write_price_history(fold_price_history(self.price_history(), rows))
+
+    def _write_price_history(self, df):
+        import pyarrow as pa
+        path = self.paths['price_history']
+        write_arrow(path, pa.Table.from_pandas(df, preserve_index=False))
+        # Replaying a log the file already holds is harmless here: rows are keyed by (id, date)
+        if os.path.exists(log_path(path)):
+            os.remove(log_path(path))
+
+    def price_history(self):
+        path = self.paths['price_history']
+        with self.lock.hold(exclusive=False):
+            stored = read_arrow(path) if os.path.exists(path) else []
+            return fold_price_history(stored, read_jsonl(log_path(path)))
+
+    def load_balance(self):
+        return read_json(self.paths['balance'], {}).get('initial_balance', 0)
+
+    def save_balance(self, balance):
+        with self.lock.hold():
+            atomic_write_json(self.paths['balance'], {'initial_balance': balance})
+
+    def snapshot_path(self, store):
+        return os.path.splitext(self.paths[store])[0] + '.arrow'
+
+    # Queries: JSON has no index, so these filter the full journal in pandas
+
+    def frame(self, store):
+        # Stamped with the columns too, so a schema change rebuilds the snapshot
+        return snapshot_frame(self.snapshot_path(store), self.signature(store) + (list(SCHEMAS[store]),),
+                              lambda: typed_frame(self.load(store), SCHEMAS[store]))
+
+    def month_trades(self, store, year, month):
+        df = self.frame(store)
+        in_month = (df['date'].dt.year == year) & (df['date'].dt.month == month)
+        return df[in_month].reset_index(drop=True)
+
+    def rollup(self, period):
+        return rollup_frame(self.load_rollup(), period)
+
+    def month_daily_pnl(self, store, year, month):
+        start, end = month_bounds(year, month)
+        rows = [r for r in self.load_rollup()
+                if r['period'] == 'day' and r['market'] == store and start <= r['bucket'] < end]
+        return rollup_daily_by_day(rows)
+
+    def symbol_months(self):
+        return pd.concat([symbol_months(market, self.frame(market)) for market in ROLLUP_MARKETS],
+                         ignore_index=True)
+
+    def holdings(self, status=None):
+        records = self.load('holdings')
+        if status is None:
+            return records
+        return [h for h in records if h.get('status') == status]
+
+    def _filtered(self, store, start=None, end=None, symbols=()):
+        df = self.frame(store)
+        start, end = page_bounds(start, end)
+        dates = df[PAGE_DATE_COLUMNS[store]]
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= dates < pd.Timestamp(end)
+        if symbols:
+            mask &= df['symbol'].isin(symbols)
+        return df[mask]
+
+    def count(self, store, start=None, end=None, symbols=()):
+        return len(self._filtered(store, start, end, symbols))
+
+    def page(self, store, start=None, end=None, symbols=(), sort_by='date', descending=True,
+             offset=0, limit=50):
+        check_sort(store, sort_by)
+        df = self._filtered(store, start, end, symbols)
+        # Stable sort keeps entry order for ties; missing values go last either way
+        df = df.sort_values(sort_by, ascending=not descending, kind='stable', na_position='last')
+        return df.iloc[offset:offset + limit].reset_index(drop=True)
+
+    def symbols(self, store):
+        return sorted(self.frame(store)['symbol'].dropna().unique())
+
+
+SQL_TYPES = {'datetime': 'TEXT', 'float': 'REAL', 'str': 'TEXT'}
+TABLES = {'spot': 'spot_trades', 'futures': 'futures_entries', 'holdings': 'holdings', 'ledger': 'cash_ledger'}
+INDEXES = {
+    'spot': ['date', 'symbol'],
+    'futures': ['date', 'symbol'],
+    'holdings': ['status', 'symbol'],
+    'ledger': ['date'],
+}
+
+
+class SQLiteBackend:
+    # Single SQLite file with one table per store plus a version per store
+
+    def __init__(self, path):
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+        with self._transaction() as conn:
+            for store, schema in SCHEMAS.items():
+                columns = [f"{name} {SQL_TYPES[kind]}" for name, kind in schema.items()]
+                if store == 'holdings':
+                    columns[0] = "id TEXT PRIMARY KEY"
+                # Fields outside the schema are kept as JSON
+                columns.append("extra TEXT")
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLES[store]} ({', '.join(columns)})")
+                self._migrate_columns(conn, store)
+                for column in INDEXES[store]:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLES[store]}_{column} "
+                                 f"ON {TABLES[store]} ({column})")
+            conn.execute("CREATE TABLE IF NOT EXISTS balance (id INTEGER PRIMARY KEY CHECK (id = 1), "
+                         "initial_balance REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS store_versions (store TEXT PRIMARY KEY, "
+                         "version INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS pnl_rollup (period TEXT, market TEXT, symbol TEXT, "
+                         "bucket TEXT, pnl REAL, volume REAL, trades INTEGER, "
+                         "PRIMARY KEY (period, market, symbol, bucket))")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats_daily (date TEXT PRIMARY KEY, pnl REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS holding_prices (id TEXT, date TEXT, price REAL, "
+                         "unrealized_pnl REAL, PRIMARY KEY (id, date))")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS stats_totals (id INTEGER PRIMARY KEY CHECK (id = 1), "
+                         f"{', '.join(name + ' REAL NOT NULL DEFAULT 0' for name in STATS_COUNTERS)})")
+            conn.executemany("INSERT OR IGNORE INTO store_versions (store, version) VALUES (?, 0)",
+                             [(store,) for store in list(SCHEMAS) + ['balance', 'price_history']])
+            # Databases created before the rollup table existed are backfilled once
+            has_rollup = conn.execute("SELECT 1 FROM pnl_rollup LIMIT 1").fetchone()
+            has_trades = conn.execute("SELECT 1 FROM spot_trades UNION ALL "
+                                      "SELECT 1 FROM futures_entries LIMIT 1").fetchone()
+            if has_trades and not has_rollup:
+                for market in ROLLUP_MARKETS:
+                    self._rebuild_rollup(conn, market)
+            if not conn.execute("SELECT 1 FROM stats_totals").fetchone():
+                self._rebuild_stats(conn)
+
+    def _migrate_columns(self, conn, store):
+        # Tables created before a schema gained columns get them added; values that
+        # were kept in the extra JSON move into the new column
+        table = TABLES[store]
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, kind in SCHEMAS[store].items():
+            if name in existing:
+                continue
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {SQL_TYPES[kind]}")
+            conn.execute(f"UPDATE {table} SET {name} = json_extract(extra, '$.{name}'), "
+                         f"extra = NULLIF(json_remove(extra, '$.{name}'), '{{}}') "
+                         f"WHERE extra IS NOT NULL AND json_type(extra, '$.{name}') IS NOT NULL")
+            self._bump_version(conn, store)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent writers
+        # wait on the busy timeout instead of failing on a stale read snapshot
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _read(self, sql, params=()):
+        conn = self._connect()
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+    def _bump_version(self, conn, store):
+        conn.execute("UPDATE store_versions SET version = version + 1 WHERE store = ?", (store,))
+
+    def _row(self, store, record):
+        schema = SCHEMAS[store]
+        extra = {k: v for k, v in record.items() if k not in schema}
+        return [record.get(name) for name in schema] + [json.dumps(extra) if extra else None]
+
+    def _insert_sql(self, store):
+        columns = list(SCHEMAS[store]) + ['extra']
+        sql = (f"INSERT INTO {TABLES[store]} ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' for _ in columns)})")
+        if store in STORE_KEYS:
+            key = STORE_KEYS[store]
+            updates = ', '.join(f"{c} = excluded.{c}" for c in columns if c != key)
+            sql += f" ON CONFLICT({key}) DO UPDATE SET {updates}"
+        return sql
+
+    def signature(self, store):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT version FROM store_versions WHERE store = ?", (store,)).fetchone()
+        finally:
+            conn.close()
+        return (self.path, store, row[0] if row else 0)
+
+    def load(self, store, where="", params=()):
+        conn = self._connect()
+        try:
+            return self._records(conn, store, where, params)
+        finally:
+            conn.close()
+
+    def _records(self, conn, store, where="", params=()):
+        columns = list(SCHEMAS[store]) + ['extra']
+        rows = conn.execute(f"SELECT {', '.join(columns)} FROM {TABLES[store]} {where} ORDER BY rowid",
+                            params).fetchall()
+        records = []
+        for row in rows:
+            # Leave out NULL columns so records look like the JSON entries
+            record = {name: value for name, value in zip(columns[:-1], row[:-1]) if value is not None}
+            if row[-1]:
+                record.update(json.loads(row[-1]))
+            records.append(record)
+        return records
+
+    def save(self, store, records):
+        with self._transaction() as conn:
+            conn.execute(f"DELETE FROM {TABLES[store]}")
+            conn.executemany(self._insert_sql(store), [self._row(store, r) for r in records])
+            if store in ROLLUP_MARKETS:
+                self._rebuild_rollup(conn, store)
+                self._rebuild_stats(conn)
+            if store == 'holdings':
+                conn.execute("DELETE FROM holding_prices WHERE id NOT IN (SELECT id FROM holdings)")
+                self._record_prices(conn, records)
+            self._bump_version(conn, store)
+
+    def append(self, store, records):
+        with self._transaction() as conn:
+            conn.executemany(self._insert_sql(store), [self._row(store, r) for r in records])
+            if store in ROLLUP_MARKETS:
+                deltas = rollup_rows(store, records)
+                self._apply_rollup(conn, deltas)
+                self._apply_stats(conn, day_totals(deltas))
+            if store == 'holdings':
+                self._record_prices(conn, records)
+            self._bump_version(conn, store)
+
+    def update(self, store, key_value, changes):
+        key = STORE_KEYS[store]
+        with self._transaction() as conn:
+            rows = self._records(conn, store, f"WHERE {key} = ?", (key_value,))
+            if not rows:
+                return None
+            fields = changes(rows[0])
+            if fields is None:
+                return None
+            record = {**rows[0], **fields}
+            conn.execute(self._insert_sql(store), self._row(store, record))
+            if store == 'holdings':
+                self._record_prices(conn, [record])
+            self._bump_version(conn, store)
+            return record
+
+    def update_batch(self, store, changes):
+        with self._transaction() as conn:
+            records = changes(self._records(conn, store))
+            if records:
+                conn.executemany(self._insert_sql(store), [self._row(store, r) for r in records])
+                if store == 'holdings':
+                    self._record_prices(conn, records)
+                self._bump_version(conn, store)
+            return records
+
+    def _record_prices(self, conn, records):
+        rows = holding_snapshots(records)
+        conn.executemany("INSERT OR REPLACE INTO holding_prices (id, date, price, unrealized_pnl) "
+                         "VALUES (:id, :date, :price, :unrealized_pnl)", rows)
+        self._bump_version(conn, 'price_history')
+
+    def price_history(self):
+        df = self._read("SELECT id, date, price, unrealized_pnl FROM holding_prices ORDER BY date, id")
+        return fold_price_history(typed_frame(df, PRICE_HISTORY_SCHEMA))
+
+    # Rollups are updated in the same transaction as the entries they summarize
+
+    def _apply_rollup(self, conn, deltas):
+        conn.executemany(
+            "INSERT INTO pnl_rollup (period, market, symbol, bucket, pnl, volume, trades) "
+            "VALUES (:period, :market, :symbol, :bucket, :pnl, :volume, :trades) "
+            "ON CONFLICT (period, market, symbol, bucket) DO UPDATE SET "
+            "pnl = pnl + excluded.pnl, volume = volume + excluded.volume, trades = trades + excluded.trades",
+            deltas)
+
+    def _apply_stats(self, conn, totals):
+        for date, pnl, volume in totals:
+            row = conn.execute("SELECT pnl FROM stats_daily WHERE date = ?", (date,)).fetchone()
+            old = row[0] if row else None
+            new = (old or 0.0) + pnl
+            delta = StatsAccumulator.day_delta(old, new)
+            delta['volume'] += volume
+            conn.execute("INSERT INTO stats_daily (date, pnl) VALUES (?, ?) "
+                         "ON CONFLICT(date) DO UPDATE SET pnl = excluded.pnl", (date, new))
+            conn.execute(f"UPDATE stats_totals SET {', '.join(f'{n} = {n} + :{n}' for n in STATS_COUNTERS)} "
+                         f"WHERE id = 1", delta)
+
+    def _rebuild_stats(self, conn):
+        rows = conn.execute("SELECT bucket, SUM(pnl), SUM(volume) FROM pnl_rollup "
+                            "WHERE period = 'day' GROUP BY bucket").fetchall()
+        acc = StatsAccumulator()
+        for date, pnl, volume in rows:
+            acc.add(date, pnl, volume)
+        conn.execute("DELETE FROM stats_daily")
+        conn.executemany("INSERT INTO stats_daily (date, pnl) VALUES (?, ?)", list(acc.daily.items()))
+        conn.execute("DELETE FROM stats_totals")
+        conn.execute(f"INSERT INTO stats_totals (id, {', '.join(STATS_COUNTERS)}) "
+                     f"VALUES (1, {', '.join(':' + n for n in STATS_COUNTERS)})", acc.counters)
+
+    def statistics(self):
+        conn = self._connect()
+        try:
+            row = conn.execute(f"SELECT {', '.join(STATS_COUNTERS)} FROM stats_totals WHERE id = 1").fetchone()
+        finally:
+            conn.close()
+        return StatsAccumulator(counters=dict(zip(STATS_COUNTERS, row or ()))).stats()
+
+    def _rebuild_rollup(self, conn, market):
+        conn.execute("DELETE FROM pnl_rollup WHERE market = ?", (market,))
+        self._apply_rollup(conn, rollup_rows(market, self._records(conn, market)))
+
+    def load_balance(self):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT initial_balance FROM balance WHERE id = 1").fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0
+
+    def save_balance(self, balance):
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO balance (id, initial_balance) VALUES (1, ?) "
+                         "ON CONFLICT(id) DO UPDATE SET initial_balance = excluded.initial_balance",
+                         (balance,))
+            self._bump_version(conn, 'balance')
+
+    def snapshot_path(self, store):
+        return f"{os.path.splitext(self.path)[0]}-{store}.arrow"
+
+    def frame(self, store):
+        # Stamped with the columns too, so a schema change rebuilds the snapshot
+        return snapshot_frame(self.snapshot_path(store), self.signature(store) + (list(SCHEMAS[store]),),
+                              lambda: typed_frame(self.load(store), SCHEMAS[store]))
+
+    # Queries pushed down to SQL so only the needed rows are read
+
+    def month_trades(self, store, year, month):
+        start, end = month_bounds(year, month)
+        df = self._read(f"SELECT {', '.join(SCHEMAS[store])} FROM {TABLES[store]} "
+                        f"WHERE date >= ? AND date < ? ORDER BY rowid", (start, end))
+        return typed_frame(df, SCHEMAS[store])
+
+    def rollup(self, period):
+        rows = self._read("SELECT * FROM pnl_rollup WHERE period = ?", (period,))
+        return rollup_frame(rows, period)
+
+    def month_daily_pnl(self, store, year, month):
+        start, end = month_bounds(year, month)
+        rows = self._read("SELECT * FROM pnl_rollup WHERE period = 'day' AND market = ? "
+                          "AND bucket >= ? AND bucket < ?", (store, start, end))
+        return rollup_daily_by_day(rows)
+
+    def symbol_months(self):
+        # TOTAL() is 0.0 over NULLs, like a pandas sum
+        select = ("SELECT '{market}' AS market, {symbol} AS symbol, substr(date, 1, 7) AS month, "
+                  "TOTAL(pnl) AS total_pnl, COUNT(*) AS trades, TOTAL(pnl > 0) AS wins, "
+                  "TOTAL({volume}) AS volume, MAX(pnl) AS best_trade, MIN(pnl) AS worst_trade "
+                  "FROM {table} WHERE date IS NOT NULL AND {symbol} IS NOT NULL GROUP BY 2, 3")
+        df = self._read(
+            select.format(market='spot', symbol='symbol', volume='volume', table=TABLES['spot'])
+            + " UNION ALL "
+            + select.format(market='futures', symbol="COALESCE(NULLIF(symbol, ''), 'Futures')",
+                            volume='size', table=TABLES['futures']))
+        return df.astype({'trades': 'int64', 'wins': 'int64'})[SYMBOL_MONTH_COLUMNS]
+
+    def holdings(self, status=None):
+        if status is None:
+            return self.load('holdings')
+        return self.load('holdings', "WHERE status = ?", (status,))
+
+    def _page_where(self, store, start=None, end=None, symbols=()):
+        start, end = page_bounds(start, end)
+        column = PAGE_DATE_COLUMNS[store]
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append(f"{column} < ?")
+            params.append(end)
+        if symbols:
+            clauses.append(f"symbol IN ({', '.join('?' for _ in symbols)})")
+            params.extend(symbols)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def count(self, store, start=None, end=None, symbols=()):
+        where, params = self._page_where(store, start, end, symbols)
+        conn = self._connect()
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {TABLES[store]} {where}", params).fetchone()[0]
+        finally:
+            conn.close()
+
+    def page(self, store, start=None, end=None, symbols=(), sort_by='date', descending=True,
+             offset=0, limit=50):
+        check_sort(store, sort_by)
+        where, params = self._page_where(store, start, end, symbols)
+        order = 'DESC' if descending else 'ASC'
+        df = self._read(f"SELECT {', '.join(SCHEMAS[store])} FROM {TABLES[store]} {where} "
+                        f"ORDER BY {sort_by} IS NULL, {sort_by} {order}, rowid LIMIT ? OFFSET ?",
+                        params + [limit, offset])
+        return typed_frame(df, SCHEMAS[store])
+
+    def symbols(self, store):
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT DISTINCT symbol FROM {TABLES[store]} "
+                                f"WHERE symbol IS NOT NULL ORDER BY symbol").fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    # Seed a new database from the JSON files
+    def import_from(self, backend):
+        for store in SCHEMAS:
+            records = backend.load(store)
+            if records:
+                self.save(store, records)
+        balance = backend.load_balance()
+        if balance:
+            self.save_balance(balance)
+        history = backend.price_history()
+        if len(history):
+            rows = history.assign(date=history['date'].dt.strftime('%Y-%m-%d')).to_dict('records')
+            with self._transaction() as conn:
+                conn.executemany("INSERT OR IGNORE INTO holding_prices (id, date, price, unrealized_pnl) "
+                                 "VALUES (:id, :date, :price, :unrealized_pnl)", rows)
+                self._bump_version(conn, 'price_history')
+
+
+def create_backend(mode, paths, sqlite_path):
+    if mode == 'sqlite':
+        fresh = not os.path.exists(sqlite_path)
+        backend = SQLiteBackend(sqlite_path)
+        if fresh:
+            backend.import_from(JsonBackend(paths))
+        return backend
+    return JsonBackend(paths, append_only=(mode == 'jsonl'))
+
+
+# Mark-to-market: symbol -> price applied to all open holdings in one vectorized
+# pass. Symbols match case-insensitively; only holdings whose price changes are returned.
+def price_key(symbol):
+    return str(symbol).strip().upper()
+
+
+def reprice_holdings(records, prices):
+    if not records or not prices:
+        return []
+    prices = {price_key(symbol): float(price) for symbol, price in prices.items()}
+    df = typed_frame(records, HOLDINGS_SCHEMA)
+    price = df['symbol'].map(price_key).map(prices)
+    changed = (df['status'] == 'open') & price.notna() & (price != df['current_price'])
+    unrealized = (df['quantity'] * price) - (df['quantity'] * df['entry_price'])
+    return [{**records[i], 'current_price': float(p), 'unrealized_pnl': float(pnl)}
+            for i, p, pnl in zip(df.index[changed], price[changed], unrealized[changed])]
+
+
+PRICE_COLUMNS = ['price', 'current_price', 'close', 'last']
+
+
+def read_price_frame(source, name):
+    # symbol,price[,timestamp] table (CSV or Parquet) -> frame with numeric prices
+    if name.lower().endswith('.parquet'):
+        df = pd.read_parquet(source)
+    else:
+        df = pd.read_csv(source)
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    column = next((c for c in PRICE_COLUMNS if c in df.columns), None)
+    if 'symbol' not in df.columns or column is None:
+        raise ValueError("Price file needs a 'symbol' column and a 'price' (or close/last) column")
+    frame = pd.DataFrame({'symbol': df['symbol'], 'price': pd.to_numeric(df[column], errors='coerce')})
+    time_column = next((c for c in ['timestamp', 'date', 'time'] if c in df.columns), None)
+    if time_column is not None:
+        # Naive UTC: stamps with an offset (Z, +07:00) are converted, naive ones taken as UTC
+        frame['timestamp'] = pd.to_datetime(df[time_column], errors='coerce', format='mixed',
+                                            utc=True).dt.tz_localize(None)
+    frame = frame[frame['price'].notna() & frame['symbol'].notna()]
+    return frame.assign(symbol=frame['symbol'].astype(str)).reset_index(drop=True)
+
+
+def read_prices(source, name):
+    # {symbol: price}; later rows win
+    frame = read_price_frame(source, name)
+    return dict(zip(frame['symbol'], frame['price'].astype(float)))
+
+
+# Export a whole store: CSV as the raw records, Parquet as the typed frame
+EXPORT_MIME_TYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+
+def export_bytes(backend, store, fmt):
+    if fmt == 'csv':
+        return pd.DataFrame(backend.load(store)).to_csv(index=False).encode('utf-8')
+    if fmt == 'parquet':
+        buffer = io.BytesIO()
+        backend.frame(store).to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+# Bulk import: CSV/Parquet exports read in chunks, coerced to the entry schemas
+# and appended in one batch (rollups and stats follow through append())
+IMPORT_CHUNK_ROWS = 50_000
+IMPORT_REQUIRED = {'spot': ('date', 'symbol', 'pnl'), 'futures': ('date', 'pnl')}
+IMPORT_DEFAULTS = {'position': 'Long', 'side': 'Long', 'entry_price': 0.0, 'exit_price': 0.0, 'volume': 0.0,
+                   'size': 0.0, 'leverage': 1.0, 'fees': 0.0, 'funding': 0.0, 'notes': ''}
+IMPORT_ALIASES = {'pair': 'symbol', 'side': 'position', 'qty': 'volume', 'p&l': 'pnl',
+                  'realized_pnl': 'pnl', 'time': 'timestamp', 'note': 'notes'}
+IMPORT_POSITIONS = {'long': 'Long', 'buy': 'Long', 'short': 'Short', 'sell': 'Short'}
+
+
+def read_import_chunks(source, name, chunk_rows=IMPORT_CHUNK_ROWS):
+    if name.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+
+
+def _import_column(name):
+    name = str(name).strip().lower().replace(' ', '_')
+    return IMPORT_ALIASES.get(name, name)
+
+
+def coerce_import(chunk, store):
+    # Returns (records shaped like the entry forms' new_entry, rejected row count)
+    df = chunk.rename(columns=_import_column)
+    if store == 'futures':
+        # Futures keep the trade direction as 'side' and the notional as 'size'
+        df = df.rename(columns={'position': 'side', 'volume': 'size'})
+    missing = [c for c in IMPORT_REQUIRED[store] if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing column(s) for {store}: {', '.join(missing)}")
+
+    out = pd.DataFrame(index=df.index)
+    dates = pd.to_datetime(df['date'], errors='coerce', format='mixed')
+    valid = dates.notna()
+    for column, kind in SCHEMAS[store].items():
+        if column == 'date':
+            out[column] = dates.dt.strftime('%Y-%m-%d')
+        elif column == 'timestamp':
+            # Exports without a separate time column fall back to the full trade datetime
+            if column in df.columns:
+                stamps = df[column].fillna('').astype(str).str.strip()
+            else:
+                stamps = pd.Series('', index=df.index)
+            out[column] = stamps.where(stamps != '', dates.dt.strftime('%Y-%m-%dT%H:%M:%S'))
+        elif column not in df.columns:
+            out[column] = IMPORT_DEFAULTS.get(column, '')
+        elif kind == 'float':
+            values = pd.to_numeric(df[column].replace('', None), errors='coerce')
+            if column in IMPORT_REQUIRED[store]:
+                valid &= values.notna()
+            out[column] = values.fillna(IMPORT_DEFAULTS.get(column, 0.0)).astype(float)
+        elif column in ('position', 'side'):
+            positions = df[column].fillna('').astype(str).str.strip().str.lower()
+            positions = positions.map(IMPORT_POSITIONS).where(positions != '', IMPORT_DEFAULTS[column])
+            valid &= positions.notna()
+            out[column] = positions
+        else:
+            out[column] = df[column].fillna('').astype(str).str.strip()
+            if column in IMPORT_REQUIRED[store]:
+                valid &= out[column] != ''
+    return out[valid].to_dict('records'), int((~valid).sum())
+
+
+def import_key(record):
+    return (record.get('date'), record.get('symbol'), record.get('timestamp'), _number(record.get('pnl')))
+
+
+def import_records(backend, store, chunks):
+    # Rows are only matched against entries already in the store, one entry per
+    # row: a date-only export can hold several trades with the same key, and
+    # importing it again skips each of them exactly once
+    stored = collections.Counter(import_key(r) for r in backend.load(store))
+    records, duplicates, rejected = [], 0, 0
+    for chunk in chunks:
+        rows, bad = coerce_import(chunk, store)
+        rejected += bad
+        for record in rows:
+            key = import_key(record)
+            if stored[key] > 0:
+                stored[key] -= 1
+                duplicates += 1
+                continue
+            records.append(record)
+    if records:
+        backend.append(store, records)
+    return {'imported': len(records), 'duplicates': duplicates, 'rejected': rejected}